@@ -0,0 +1,330 @@
+import re
+import warnings
+import dateutil.parser
+import numpy as np
+from django.db.models import F
+from django.db.models.fields.json import KeyTextTransform
+from .models import Record
+from .records import RecordQueryError, SENSOR_CHANNELS, filter_time_window, parse_fields
+
+DURATION = re.compile(r'^(\d+(?:\.\d+)?)(ms|s|m|h)$')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+AGGREGATES = ('min', 'max', 'avg', 'sum', 'count')
+
+def parse_duration(value, name):
+    match = DURATION.match(value or '')
+    if not match or float(match.group(1)) <= 0:
+        raise RecordQueryError(f'Intervalo inválido em {name}: {value} (ex.: 500ms, 10s, 1m)')
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+def parse_aggregates(value):
+    aggregates = [agg.strip() for agg in (value or 'min,max,avg').split(',') if agg.strip()]
+    for agg in aggregates:
+        if agg not in AGGREGATES:
+            raise RecordQueryError(f'Agregação inválida: {agg} (disponíveis: {", ".join(AGGREGATES)})')
+    return aggregates
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def to_float_column(values):
+    # Channels are cleaned at ingest (see telemetry), so the whole column
+    # converts in one call; the per-value path only serves legacy rows
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([to_float(value) for value in values], dtype=np.float64)
+
+def timestamps_to_epoch(values):
+    # Fast path: numpy parses a whole column of ISO 8601 strings at once
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            parsed = np.array(values, dtype='datetime64[ms]')
+    except (TypeError, ValueError):
+        pass
+    else:
+        # A missing timestamp parses as NaT, which casts to the smallest int64
+        epoch = parsed.astype('int64') / 1000.0
+        epoch[np.isnat(parsed)] = np.nan
+        return epoch
+
+    epoch = np.empty(len(values))
+    for i, value in enumerate(values):
+        if isinstance(value, (int, float)):
+            epoch[i] = value
+            continue
+        try:
+            epoch[i] = dateutil.parser.isoparse(value).timestamp()
+        except (TypeError, ValueError):
+            epoch[i] = np.nan
+    return epoch
+
+def time_expression(time_field):
+    # The column or JSON key the records are placed in time by
+    if time_field == 'created_at':
+        return F('created_at')
+    return KeyTextTransform('timestamp', 'data')
+
+def load_rows(queryset, fields, time_field, *extra):
+    return list(
+        queryset.annotate(
+            _time=time_expression(time_field),
+            **{f'_field_{i}': KeyTextTransform(field, 'data') for i, field in enumerate(fields)}
+        ).values_list(*extra, '_time', *[f'_field_{i}' for i in range(len(fields))])
+    )
+
+def rows_to_columns(rows, fields, time_field):
+    # Turns (time, value, ...) rows into sorted epoch times and one float64
+    # column per channel, with NaN where a value is missing.
+    if not rows:
+        return np.empty(0), {field: np.empty(0) for field in fields}
+
+    times = [row[0] for row in rows]
+    if time_field == 'created_at':
+        t = np.array([value.timestamp() for value in times])
+    else:
+        t = timestamps_to_epoch(times)
+
+    columns = {
+        field: to_float_column([row[i + 1] for row in rows])
+        for i, field in enumerate(fields)
+    }
+
+    valid = ~np.isnan(t)
+    order = np.argsort(t[valid], kind='stable')
+    t = t[valid][order]
+    columns = {field: column[valid][order] for field, column in columns.items()}
+    return t, columns
+
+def load_channels(mission_id, params, default_fields=SENSOR_CHANNELS):
+    fields = parse_fields(params.get('fields')) or list(default_fields)
+    time_field = params.get('time_field', 'timestamp')
+    queryset = filter_time_window(Record.objects.filter(mission_id=mission_id), params)
+    return rows_to_columns(load_rows(queryset, fields, time_field), fields, time_field)
+
+def load_missions_channels(mission_ids, fields, time_field='timestamp'):
+    # One query for every mission, split afterwards
+    rows = load_rows(Record.objects.filter(mission_id__in=mission_ids), fields, time_field, 'mission_id')
+    grouped = {mission_id: [] for mission_id in mission_ids}
+    for row in rows:
+        grouped[row[0]].append(row[1:])
+    return {
+        mission_id: rows_to_columns(mission_rows, fields, time_field)
+        for mission_id, mission_rows in grouped.items()
+    }
+
+def to_json_list(array, decimals=6):
+    return [None if np.isnan(value) else value for value in np.round(array, decimals).tolist()]
+
+def aggregate_buckets(t, columns, bucket_seconds, aggregates):
+    if len(t) == 0:
+        return {'start': None, 'bucket_seconds': bucket_seconds, 'time': [], 'count': [], 'series': {}}
+
+    start = t[0]
+    index = np.floor((t - start) / bucket_seconds).astype(np.int64)
+    # t is sorted, so each bucket is a contiguous run starting at `offsets`
+    buckets, offsets = np.unique(index, return_index=True)
+
+    series = {}
+    for field, values in columns.items():
+        present = ~np.isnan(values)
+        count = np.add.reduceat(present.astype(np.int64), offsets)
+        total = np.add.reduceat(np.where(present, values, 0.0), offsets)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            results = {
+                'min': np.fmin.reduceat(values, offsets),
+                'max': np.fmax.reduceat(values, offsets),
+                'sum': np.where(count > 0, total, np.nan),
+                'avg': np.where(count > 0, total / count, np.nan),
+                'count': count.astype(np.float64),
+            }
+        series[field] = {agg: to_json_list(results[agg]) for agg in aggregates}
+
+    return {
+        'start': float(start),
+        'bucket_seconds': bucket_seconds,
+        'time': to_json_list(start + buckets * bucket_seconds, 3),
+        'count': np.diff(np.append(offsets, len(t))).tolist(),
+        'series': series,
+    }
+
+ALIGNMENTS = ('time', 'altitude')
+
+def alignment_axis(t, columns, align):
+    # Returns the x coordinate of every sample plus a mask of the samples
+    # that take part in the alignment
+    if align == 'time':
+        return t - t[0], np.ones(len(t), dtype=bool)
+
+    # Altitude alignment follows the ascent: keep samples that set a new
+    # altitude maximum so the axis is strictly increasing
+    altitude = columns.get('altitude_m')
+    if altitude is None:
+        raise RecordQueryError('O alinhamento por altitude requer altitude_m')
+    present = ~np.isnan(altitude)
+    filled = np.where(present, altitude, -np.inf)
+    previous_max = np.concatenate(([-np.inf], np.maximum.accumulate(filled)[:-1]))
+    return altitude, present & (filled > previous_max)
+
+def compare_missions(missions_channels, fields, align, points):
+    axes = {}
+    for mission_id, (t, columns) in missions_channels.items():
+        if len(t) == 0:
+            continue
+        x, mask = alignment_axis(t, columns, align)
+        if mask.any():
+            axes[mission_id] = (x, mask)
+
+    if not axes:
+        return {'align': align, 'grid': [], 'missions': list(missions_channels), 'fields': fields, 'values': {}}
+
+    low = min(x[mask].min() for x, mask in axes.values())
+    high = max(x[mask].max() for x, mask in axes.values())
+    grid = np.linspace(low, high, points)
+
+    values = {}
+    for field in fields:
+        matrix = np.full((len(missions_channels), points), np.nan)
+        for row, (mission_id, (t, columns)) in enumerate(missions_channels.items()):
+            if mission_id not in axes:
+                continue
+            x, mask = axes[mission_id]
+            y = columns[field]
+            usable = mask & ~np.isnan(y)
+            if usable.sum() < 2:
+                continue
+            # Outside a mission's own range the result stays NaN
+            matrix[row] = np.interp(grid, x[usable], y[usable], left=np.nan, right=np.nan)
+        values[field] = [to_json_list(line) for line in matrix]
+
+    return {
+        'align': align,
+        'grid': to_json_list(grid, 3),
+        'missions': list(missions_channels),
+        'fields': fields,
+        'values': values,
+    }
+
+EARTH_RADIUS_M = 6371008.8
+OVERVIEW_POINTS = 200
+
+def haversine_distance(latitude, longitude):
+    # Total great-circle length of the track, skipping missing fixes
+    valid = ~(np.isnan(latitude) | np.isnan(longitude))
+    lat = np.radians(latitude[valid])
+    lon = np.radians(longitude[valid])
+    if len(lat) < 2:
+        return 0.0
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return float(np.sum(2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))))
+
+def channel_stats(values):
+    present = values[~np.isnan(values)]
+    if len(present) == 0:
+        return {'count': 0, 'min': None, 'max': None, 'mean': None, 'std': None}
+    return {
+        'count': int(len(present)),
+        'min': round(float(present.min()), 6),
+        'max': round(float(present.max()), 6),
+        'mean': round(float(present.mean()), 6),
+        'std': round(float(present.std()), 6),
+    }
+
+def vertical_profile(t, altitude):
+    valid = ~np.isnan(altitude)
+    t, altitude = t[valid], altitude[valid]
+    if len(t) < 2:
+        return {}
+
+    apogee = int(np.argmax(altitude))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        speed = np.diff(altitude) / np.diff(t)
+    speed = speed[np.isfinite(speed)]
+
+    def mean_rate(start, end):
+        elapsed = t[end] - t[start]
+        return round(float((altitude[end] - altitude[start]) / elapsed), 3) if elapsed > 0 else None
+
+    descent = mean_rate(apogee, len(t) - 1)
+    return {
+        'max_altitude_m': round(float(altitude[apogee]), 3),
+        'apogee_seconds': round(float(t[apogee] - t[0]), 3),
+        'ascent_rate_m_s': mean_rate(0, apogee),
+        'descent_rate_m_s': -descent if descent is not None else None,
+        'max_ascent_rate_m_s': round(float(speed.max()), 3) if len(speed) else None,
+        'max_descent_rate_m_s': round(float(-speed.min()), 3) if len(speed) else None,
+    }
+
+def summarize_mission(t, columns):
+    # Derived products computed once when a mission is closed
+    if len(t) == 0:
+        return {'record_count': 0}, None
+
+    summary = {
+        'record_count': int(len(t)),
+        'duration_seconds': round(float(t[-1] - t[0]), 3),
+        'channels': {field: channel_stats(values) for field, values in columns.items()},
+    }
+    if 'altitude_m' in columns:
+        summary.update(vertical_profile(t, columns['altitude_m']))
+    if 'latitude' in columns and 'longitude' in columns:
+        summary['ground_track_m'] = round(haversine_distance(columns['latitude'], columns['longitude']), 1)
+
+    bucket_seconds = max(summary['duration_seconds'] / OVERVIEW_POINTS, 1e-3)
+    overview = aggregate_buckets(t, columns, bucket_seconds, ['avg'])
+    overview['series'] = {field: values['avg'] for field, values in overview['series'].items()}
+    return summary, overview
+
+def project_local(latitude, longitude):
+    # Equirectangular projection around the first fix, in metres; plenty for
+    # the few hundred kilometres a flight covers
+    lat0 = np.radians(latitude[0])
+    x = EARTH_RADIUS_M * np.radians(longitude - longitude[0]) * np.cos(lat0)
+    y = EARTH_RADIUS_M * np.radians(latitude - latitude[0])
+    return x, y
+
+def segment_distances(x, y, start, end):
+    # Distance from every point strictly between start and end to the segment
+    px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+    dx, dy = x[end] - x[start], y[end] - y[start]
+    length = dx * dx + dy * dy
+    if length == 0:
+        return np.hypot(px, py)
+    u = np.clip((px * dx + py * dy) / length, 0, 1)
+    return np.hypot(px - u * dx, py - u * dy)
+
+def simplify_polyline(x, y, tolerance):
+    # Douglas-Peucker; returns the indices of the points to keep
+    n = len(x)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = segment_distances(x, y, start, end)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep)
+
+def simplify_trajectory(latitude, longitude, tolerance):
+    valid = ~(np.isnan(latitude) | np.isnan(longitude))
+    latitude, longitude = latitude[valid], longitude[valid]
+    if len(latitude) == 0:
+        return []
+    keep = simplify_polyline(*project_local(latitude, longitude), tolerance)
+    return np.round(np.column_stack((latitude[keep], longitude[keep])), 7).tolist()
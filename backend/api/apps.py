@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Connects the receivers that keep the mission registry and the
+        # close-out products current, in every process that loads the app
+        from . import pipeline, registry  # noqa: F401
@@ -0,0 +1,191 @@
+import datetime
+import json
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .analysis import load_channels, load_missions_channels, rows_to_columns
+from .compression import ENCODERS
+from .models import Mission, MissionArchive, Record
+from .partitions import clear_record_partition
+from .records import TIME_FIELDS, RecordQueryError, get_mission_records, parse_datetime, parse_fields
+from .telemetry import SENSOR_CHANNELS, format_timestamp, to_utc
+
+# Finished missions can have their records moved out of the Record table
+# into one compressed MissionArchive row, so the hot table and its indexes
+# only hold what is still being written or was recently flown. Reads go
+# through the functions below, which serve archived missions from the blob.
+ARCHIVE_VERSION = 1
+# Archives outlive the process that wrote them and may be read on a host
+# without the optional codecs, so they are always written with gzip
+ARCHIVE_ENCODING = 'gzip'
+UNPACKED_CACHE_SIZE = 4
+CODEC_PACKAGES = {'zstd': 'zstandard', 'br': 'brotli'}
+
+_unpacked = OrderedDict()
+_unpacked_lock = threading.Lock()
+
+class ArchiveCodecError(RuntimeError):
+    pass
+
+def get_archive_encoder(encoding):
+    try:
+        return ENCODERS[encoding]
+    except KeyError:
+        package = CODEC_PACKAGES.get(encoding, encoding)
+        raise ArchiveCodecError(
+            f'O arquivo usa o codec {encoding!r}, que não está disponível; instale o pacote {package!r}'
+        ) from None
+
+def pack_records(rows, encoding):
+    payload = {
+        'version': ARCHIVE_VERSION,
+        'records': [
+            [row['id'], row['created_at'].isoformat(), row['dedup_key'], row['data']]
+            for row in rows
+        ],
+    }
+    return get_archive_encoder(encoding).compress(json.dumps(payload, separators=(',', ':')).encode())
+
+def unpack_records(data, encoding):
+    payload = json.loads(get_archive_encoder(encoding).decompress(bytes(data)))
+    return [
+        {
+            'id': id,
+            'created_at': datetime.datetime.fromisoformat(created_at),
+            'dedup_key': dedup_key,
+            'data': data,
+        }
+        for id, created_at, dedup_key, data in payload['records']
+    ]
+
+def archive_mission(mission):
+    with transaction.atomic():
+        rows = list(
+            Record.objects.filter(mission=mission).order_by('id').values('id', 'created_at', 'dedup_key', 'data')
+        )
+        MissionArchive.objects.create(
+            mission=mission,
+            encoding=ARCHIVE_ENCODING,
+            record_count=len(rows),
+            data=pack_records(rows, ARCHIVE_ENCODING),
+        )
+        if not clear_record_partition(mission.id):
+            Record.objects.filter(mission=mission).delete()
+        mission.archived_at = timezone.now()
+        mission.save(update_fields=['archived_at'])
+    return len(rows)
+
+def restore_mission(mission):
+    # Moves an archived mission's records back into the Record table
+    with transaction.atomic():
+        archive = MissionArchive.objects.get(mission=mission)
+        records = [
+            Record(id=row['id'], mission=mission, created_at=row['created_at'], dedup_key=row['dedup_key'], data=row['data'])
+            for row in unpack_records(archive.data, archive.encoding)
+        ]
+        # A raw insert keeps the original created_at, which bulk_create would
+        # overwrite through auto_now_add
+        fields = list(Record._meta.concrete_fields)
+        batch_size = connection.ops.bulk_batch_size(fields, records) or len(records)
+        for start in range(0, len(records), batch_size):
+            Record.objects._insert(records[start:start + batch_size], fields=fields, raw=True)
+        archive.delete()
+        mission.archived_at = None
+        mission.save(update_fields=['archived_at'])
+    with _unpacked_lock:
+        _unpacked.pop(mission.id, None)
+
+def archive_candidates(days=None):
+    days = getattr(settings, 'RECORD_ARCHIVE_AFTER_DAYS', 30) if days is None else days
+    return Mission.objects.filter(
+        end_date__lt=timezone.now() - datetime.timedelta(days=days),
+        archived_at__isnull=True,
+    ).order_by('end_date')
+
+def load_archive(mission):
+    # Unpacked archives are kept for the few missions read most recently.
+    # Requests run in threads, so the cache is only touched under the lock;
+    # unpacking happens outside it, and a concurrent miss just unpacks twice.
+    key = (mission.id, mission.archived_at)
+    with _unpacked_lock:
+        cached = _unpacked.get(mission.id)
+        if cached is not None and cached[0] == key:
+            _unpacked.move_to_end(mission.id)
+            return cached[1]
+
+    archive = MissionArchive.objects.get(mission_id=mission.id)
+    records = unpack_records(archive.data, archive.encoding)
+    with _unpacked_lock:
+        _unpacked[mission.id] = (key, records)
+        _unpacked.move_to_end(mission.id)
+        while len(_unpacked) > UNPACKED_CACHE_SIZE:
+            _unpacked.popitem(last=False)
+    return records
+
+def archived_time_window(records, params):
+    # Same semantics as records.filter_time_window, applied in Python
+    time_field = params.get('time_field', 'timestamp')
+    if time_field not in TIME_FIELDS:
+        raise RecordQueryError(f'time_field deve ser um de: {", ".join(TIME_FIELDS)}')
+
+    for name, keep in (('from', lambda value, bound: value >= bound), ('to', lambda value, bound: value <= bound)):
+        if not params.get(name):
+            continue
+        bound = to_utc(parse_datetime(params[name], name))
+        if time_field == 'created_at':
+            records = [record for record in records if keep(record['created_at'], bound)]
+        else:
+            bound = format_timestamp(bound)
+            records = [
+                record for record in records
+                if isinstance(record['data'].get('timestamp'), str) and keep(record['data']['timestamp'], bound)
+            ]
+    return records
+
+def mission_records(mission, params):
+    if not mission.archived_at:
+        return get_mission_records(mission.id, params)
+
+    records = archived_time_window(load_archive(mission), params)
+    fields = parse_fields(params.get('fields'))
+    if fields is None:
+        return [{'id': r['id'], 'data': r['data'], 'created_at': r['created_at']} for r in records]
+    return [
+        {
+            'id': r['id'],
+            'data': {field: r['data'][field] for field in fields if r['data'].get(field) is not None},
+            'created_at': r['created_at'],
+        }
+        for r in records
+    ]
+
+def archived_rows(mission, fields, time_field='timestamp', params=None):
+    # (time, value, ...) tuples like analysis.load_rows
+    params = params or {}
+    window = {'time_field': time_field, 'from': params.get('from'), 'to': params.get('to')}
+    records = archived_time_window(load_archive(mission), window)
+    return [
+        (
+            record['created_at'] if time_field == 'created_at' else record['data'].get('timestamp'),
+            *[record['data'].get(field) for field in fields],
+        )
+        for record in records
+    ]
+
+def mission_channels(mission, params, default_fields=SENSOR_CHANNELS):
+    if not mission.archived_at:
+        return load_channels(mission.id, params, default_fields)
+
+    fields = parse_fields(params.get('fields')) or list(default_fields)
+    time_field = params.get('time_field', 'timestamp')
+    return rows_to_columns(archived_rows(mission, fields, time_field, params), fields, time_field)
+
+def missions_channels(missions, fields, time_field='timestamp'):
+    hot = [mission.id for mission in missions if not mission.archived_at]
+    channels = load_missions_channels(hot, fields, time_field) if hot else {}
+    for mission in missions:
+        if mission.archived_at:
+            channels[mission.id] = rows_to_columns(archived_rows(mission, fields, time_field), fields, time_field)
+    return {mission.id: channels[mission.id] for mission in missions}
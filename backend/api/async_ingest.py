@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from .authentication import TOKEN_KEYWORD, read_token
+from .ingest import write_records, write_records_one_by_one
+from .models import Mission
+from .registry import mission_registry
+from .telemetry import TelemetryError, normalize_record
+
+logger = logging.getLogger(__name__)
+
+INGEST_PATH = re.compile(r'^/api/mission/(\d+)/ingest/?$')
+# Mission states kept by MissionStateCache before expired ones are dropped
+MAX_MISSION_STATES = 1000
+
+class ClientDisconnected(Exception):
+    pass
+
+def get_options():
+    return getattr(settings, 'ASYNC_INGEST', {})
+
+class AsyncRecordQueue:
+    # Bounded asyncio queue drained by a single writer task. Requests only
+    # wait for a free slot (up to enqueue_timeout), never for the database,
+    # and a full queue is reported to the client instead of growing memory.
+    def __init__(self):
+        self._loop = None
+        self._queue = None
+        self._writer = None
+        self._stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+        }
+
+    @property
+    def max_queue(self):
+        return get_options().get('max_queue', 10000)
+
+    @property
+    def max_records(self):
+        return get_options().get('max_records', 500)
+
+    @property
+    def max_delay(self):
+        return get_options().get('max_delay_ms', 200) / 1000
+
+    @property
+    def enqueue_timeout(self):
+        return get_options().get('enqueue_timeout_ms', 100) / 1000
+
+    def _ensure_writer(self):
+        # asyncio queues belong to the loop they are used in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(self.max_queue)
+            self._writer = None
+        if self._writer is None or self._writer.done():
+            self._writer = loop.create_task(self._run())
+
+    async def put(self, mission_id, data):
+        self._ensure_writer()
+        try:
+            await asyncio.wait_for(self._queue.put((mission_id, data)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self._stats['rejected'] += 1
+            return False
+        self._stats['enqueued'] += 1
+        return True
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_records:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            await self._write(batch)
+
+    async def _write(self, batch):
+        try:
+            written, failed = await sync_to_async(self._write_sync)(batch)
+        except Exception:
+            logger.exception('Failed to write %d queued records', len(batch))
+            written, failed = 0, len(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+        self._stats['written'] += written
+        self._stats['failed'] += failed
+        self._stats['batches'] += 1
+
+    def _write_sync(self, batch):
+        close_old_connections()
+        try:
+            write_records(batch)
+        except Exception:
+            logger.warning('Failed to write %d queued records, retrying one by one', len(batch), exc_info=True)
+            return write_records_one_by_one(batch)
+        return len(batch), 0
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        # Waits for everything queued to be committed, then stops the writer
+        # while it is idle so no taken batch is dropped
+        if self._writer is None:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+class MissionStateCache:
+    # Registry lookups go through a thread, so each mission's state is kept
+    # in the event loop for a short while; a close is seen within `ttl`.
+    # Concurrent requests for the same mission share one lookup. Expired
+    # states are dropped once more than max_states missions have been seen.
+    def __init__(self, max_states=MAX_MISSION_STATES):
+        self.max_states = max_states
+        self._states = {}
+
+    @property
+    def ttl(self):
+        return get_options().get('state_ttl_ms', 1000) / 1000
+
+    async def get(self, mission_id):
+        cached = self._states.get(mission_id)
+        if cached is None or cached[1] <= time.monotonic():
+            cached = (asyncio.ensure_future(self._load(mission_id)), time.monotonic() + self.ttl)
+            self._states.pop(mission_id, None)
+            self._states[mission_id] = cached
+            if len(self._states) > self.max_states:
+                self._evict()
+        return await cached[0]
+
+    def _evict(self):
+        now = time.monotonic()
+        for mission_id in [key for key, (_, expires) in self._states.items() if expires <= now]:
+            del self._states[mission_id]
+        # Entries are in the order they were loaded; drop the oldest if
+        # every state is still fresh
+        while len(self._states) > self.max_states:
+            del self._states[next(iter(self._states))]
+
+    async def _load(self, mission_id):
+        state = await sync_to_async(mission_registry.get)(mission_id)
+        if state['is_realtime'] and state['start_date'] is None:
+            state = await sync_to_async(mission_registry.mark_started)(mission_id)
+        return state
+
+    def clear(self):
+        self._states.clear()
+
+class AsyncIngestApplication:
+    # ASGI entry point: telemetry posted to /api/mission/<id>/ingest is
+    # handled here on the event loop, everything else goes to Django.
+    def __init__(self, application):
+        self.application = application
+        self.queue = AsyncRecordQueue()
+        self.missions = MissionStateCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            match = INGEST_PATH.match(scope['path'])
+            if match:
+                return await self.ingest(scope, receive, send, int(match.group(1)))
+        return await self.application(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.queue.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, send, status, message, headers=()):
+        body = json.dumps({'success': 200 <= status < 300, 'message': message}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), *headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    def authenticate(self, scope):
+        for name, value in scope['headers']:
+            if name == b'authorization':
+                keyword, _, token = value.decode('latin-1').partition(' ')
+                if keyword.lower() != TOKEN_KEYWORD.lower():
+                    return False
+                try:
+                    read_token(token.strip())
+                except signing.BadSignature:
+                    return False
+                return True
+        return False
+
+    async def read_body(self, receive):
+        # Returns None when the body is too large
+        max_bytes = get_options().get('max_body_bytes', 64 * 1024)
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            body += message.get('body', b'')
+            if len(body) > max_bytes:
+                return None
+            if not message.get('more_body', False):
+                return body
+
+    async def ingest(self, scope, receive, send, mission_id):
+        if scope['method'] != 'POST':
+            return await self.respond(send, 405, 'Method not allowed', [(b'allow', b'POST')])
+        if not self.authenticate(scope):
+            return await self.respond(send, 401, 'Token inválido.', [(b'www-authenticate', TOKEN_KEYWORD.encode())])
+
+        try:
+            body = await self.read_body(receive)
+        except ClientDisconnected:
+            # Nobody is left to answer, and nothing was queued
+            return
+        if body is None:
+            return await self.respond(send, 413, 'Record too large')
+        try:
+            record_data = json.loads(body)
+        except ValueError:
+            return await self.respond(send, 400, 'Invalid JSON')
+        if not record_data or not isinstance(record_data, dict):
+            return await self.respond(send, 400, 'No data provided')
+        try:
+            record_data = normalize_record(record_data)
+        except TelemetryError as e:
+            return await self.respond(send, 400, str(e))
+
+        try:
+            mission = await self.missions.get(mission_id)
+        except Mission.DoesNotExist:
+            return await self.respond(send, 404, 'Mission not found')
+        if mission['end_date']:
+            return await self.respond(send, 400, 'Cannot add records to completed missions')
+
+        if not await self.queue.put(mission_id, record_data):
+            return await self.respond(send, 503, 'Ingest queue full, retry later', [(b'retry-after', b'1')])
+        return await self.respond(send, 202, 'Record queued successfully')
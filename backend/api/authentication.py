@@ -0,0 +1,84 @@
+import time
+from django.conf import settings
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+TOKEN_SALT = 'api.authentication.token'
+# Ground stations run unattended for whole missions, so they get tokens
+# signed with their own salt that carry an explicit expiry instead of the
+# session max age
+STATION_TOKEN_SALT = 'api.authentication.station'
+TOKEN_KEYWORD = 'Bearer'
+
+class TokenUser:
+    # Lightweight stand-in for the User row, rebuilt from the signed payload
+    # so authenticated requests never need to query the database.
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, payload):
+        self.id = payload['id']
+        self.name = payload.get('name', '')
+        self.email = payload.get('email', '')
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self) -> str:
+        return self.name
+
+def get_token_max_age():
+    return getattr(settings, 'AUTH_TOKEN_MAX_AGE', 60 * 60 * 12)
+
+def create_token(user):
+    payload = {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+    }
+    return signing.dumps(payload, salt=TOKEN_SALT, compress=True)
+
+def create_station_token(user, days):
+    payload = {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'exp': int(time.time()) + days * 24 * 60 * 60,
+    }
+    return signing.dumps(payload, salt=STATION_TOKEN_SALT, compress=True)
+
+def read_token(token):
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=get_token_max_age())
+    except signing.SignatureExpired:
+        raise
+    except signing.BadSignature:
+        payload = signing.loads(token, salt=STATION_TOKEN_SALT)
+    if payload.get('exp', 0) < time.time():
+        raise signing.SignatureExpired('Station token expired')
+    return payload
+
+class TokenAuthentication(BaseAuthentication):
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != TOKEN_KEYWORD.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Cabeçalho de autorização inválido.')
+
+        try:
+            token = auth[1].decode()
+            payload = read_token(token)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('A sessão expirou.')
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed('Token inválido.')
+
+        return (TokenUser(payload), token)
+
+    def authenticate_header(self, request):
+        return TOKEN_KEYWORD
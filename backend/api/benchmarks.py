@@ -0,0 +1,188 @@
+"""
+Performance regression benchmarks for the API.
+
+Not collected by the default test run; execute explicitly with
+
+    python manage.py test api.benchmarks
+
+Environment variables:
+    BENCHMARK_RECORD_COUNTS  mission sizes to seed (default "10000,100000")
+    BENCHMARK_ITERATIONS     timed requests per endpoint (default 20)
+    BENCHMARK_OUTPUT         JSON results file (default benchmark_results/<timestamp>.json)
+    BENCHMARK_BASELINE       previous results file to compare against
+"""
+import datetime
+import json
+import os
+import platform
+import statistics
+import time
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .authentication import create_token
+from .models import *
+from .telemetry import normalize_record
+from .testing import TemporaryStorageMixin
+
+RECORD_COUNTS = [int(n) for n in os.environ.get('BENCHMARK_RECORD_COUNTS', '10000,100000').split(',') if n]
+ITERATIONS = int(os.environ.get('BENCHMARK_ITERATIONS', '20'))
+ARTICLE_COUNT = 300
+IMAGE_COUNT = 600
+IMPORT_BATCH = 1000
+
+def make_record_data(i, start=None):
+    start = start or datetime.datetime(2025, 4, 1, 10, 0, 0)
+    return normalize_record({
+        'timestamp': (start + datetime.timedelta(seconds=i)).isoformat(),
+        'temperature_c': 20 + (i % 50) * 0.1,
+        'humidity_percent': 40 + (i % 30) * 0.5,
+        'pressure_hpa': 1013.25 - i * 0.01,
+        'altitude_m': i * 0.5,
+        'latitude': 38.7 + i * 1e-5,
+        'longitude': -9.1 + i * 1e-5,
+        'co2_ppm': 400 + i % 100,
+    })
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+class APIBenchmark(TemporaryStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(name='Benchmark', email='benchmark@glebsat.pt', password='x')
+        cls.token = create_token(cls.user)
+
+        category = Category.objects.create(name='Benchmark')
+        articles = NewsArticle.objects.bulk_create(
+            NewsArticle(
+                title=f'Notícia {i}',
+                summary=f'Resumo {i}',
+                content='Lorem ipsum dolor sit amet. ' * 200,
+                author=cls.user,
+            )
+            for i in range(ARTICLE_COUNT)
+        )
+        Image.objects.bulk_create(
+            Image(
+                name=f'Imagem {i}',
+                image=f'images/benchmark_{i}.jpg',
+                category=category,
+                news_article=articles[i % ARTICLE_COUNT],
+            )
+            for i in range(IMAGE_COUNT)
+        )
+
+        cls.missions = {}
+        for count in RECORD_COUNTS:
+            mission = Mission.objects.create(name=f'Missão {count}', is_realtime=False)
+            Record.objects.bulk_create(
+                (Record(mission=mission, data=make_record_data(i)) for i in range(count)),
+                batch_size=5000,
+            )
+            cls.missions[count] = mission
+
+        cls.live_mission = Mission.objects.create(name='Missão em tempo real', is_realtime=True)
+        cls.import_mission = Mission.objects.create(name='Missão importada')
+
+    def measure(self, name, send, iterations=ITERATIONS):
+        send()
+        latencies = []
+        queries = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                request_start = time.perf_counter()
+                response = send()
+                latencies.append(time.perf_counter() - request_start)
+            self.assertLess(response.status_code, 400, f'{name}: {response.content[:200]}')
+            queries.append(len(captured.captured_queries))
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'iterations': iterations,
+            'throughput_rps': iterations / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000,
+            'queries': max(queries),
+            'response_bytes': len(response.content),
+        }
+        self.results[name] = result
+        return result
+
+    def test_benchmark(self):
+        self.results = {}
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+
+        for count, mission in self.missions.items():
+            url = reverse('mission_records', args=[mission.id])
+            self.measure(f'MissionRecordsView[{count}]', lambda: self.client.get(url), iterations=max(1, ITERATIONS // 4))
+
+        add_url = reverse('add_mission_record', args=[self.live_mission.id])
+        counter = iter(range(10 ** 9))
+        self.measure(
+            'AddMissionRecordView',
+            lambda: self.client.post(add_url, make_record_data(next(counter)), content_type='application/json', **auth),
+        )
+
+        # Each run imports new packets; a repeated batch would only measure
+        # the duplicate skips
+        import_url = reverse('import_mission_records', args=[self.import_mission.id])
+        import_iterations = max(1, ITERATIONS // 4)
+        batches = iter([
+            {'records': [{'data': make_record_data(i, datetime.datetime(2025, 4, 1 + run, 10))} for i in range(IMPORT_BATCH)]}
+            for run in range(import_iterations + 1)
+        ])
+        self.measure(
+            f'ImportMissionRecordsView[{IMPORT_BATCH}]',
+            lambda: self.client.post(import_url, next(batches), content_type='application/json', **auth),
+            iterations=import_iterations,
+        )
+
+        news_url = reverse('newsarticle')
+        self.measure(f'NewsArticleView[{ARTICLE_COUNT}]', lambda: self.client.get(news_url))
+
+        image_url = reverse('image')
+        self.measure(f'ImageView[{IMAGE_COUNT}]', lambda: self.client.get(image_url))
+
+        self.save_results()
+
+    def save_results(self):
+        output = os.environ.get('BENCHMARK_OUTPUT') or os.path.join(
+            settings.BASE_DIR, 'benchmark_results',
+            datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json',
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+        report = {
+            'created_at': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': self.results,
+        }
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        baseline = {}
+        if os.environ.get('BENCHMARK_BASELINE'):
+            with open(os.environ['BENCHMARK_BASELINE']) as f:
+                baseline = json.load(f).get('results', {})
+
+        print(f'\nBenchmark results written to {output}')
+        for name, result in self.results.items():
+            line = (
+                f"{name:<36} {result['throughput_rps']:>9.1f} req/s  "
+                f"p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+                f"{result['queries']:>4} queries"
+            )
+            if name in baseline:
+                change = (result['p50_ms'] / baseline[name]['p50_ms'] - 1) * 100
+                line += f'  p50 {change:+.1f}% vs baseline'
+            print(line)
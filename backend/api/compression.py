@@ -0,0 +1,168 @@
+import glob
+import gzip
+import hashlib
+import os
+import zlib
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=6, mtime=0)
+
+    def decompress(self, data):
+        return gzip.decompress(data)
+
+    def stream(self, chunks):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if data := compressor.compress(chunk):
+                yield data
+        yield compressor.flush()
+
+class BrotliEncoder:
+    name = 'br'
+
+    def compress(self, data):
+        return brotli.compress(data, quality=5)
+
+    def decompress(self, data):
+        return brotli.decompress(data)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            if data := compressor.process(chunk):
+                yield data
+        yield compressor.finish()
+
+class ZstdEncoder:
+    name = 'zstd'
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=6).compress(data)
+
+    def decompress(self, data):
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def stream(self, chunks):
+        compressor = zstandard.ZstdCompressor(level=6).compressobj()
+        for chunk in chunks:
+            if data := compressor.compress(chunk):
+                yield data
+        yield compressor.flush()
+
+# In order of preference when the client accepts several equally
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS['zstd'] = ZstdEncoder()
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder()
+ENCODERS['gzip'] = GzipEncoder()
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+def choose_encoding(header, available=None):
+    available = ENCODERS if available is None else available
+    accepted = parse_accept_encoding(header or '')
+    wildcard = accepted.get('*', 0.0)
+
+    best, best_quality = None, 0.0
+    for name in available:
+        quality = accepted.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+class PrecompressedCache:
+    # Immutable payloads kept on disk once per encoding (plus the identity
+    # body and its strong ETag) so that serving them is a file read.
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    @property
+    def directory(self):
+        return os.path.join(settings.PRECOMPRESSED_CACHE_DIR, self.namespace)
+
+    def path(self, key, variant):
+        return os.path.join(self.directory, f'{key}.{variant}')
+
+    def variants(self):
+        # The ETag goes first so a half-removed entry is never served
+        return ['etag', 'identity', *ENCODERS]
+
+    def read(self, key, variant):
+        try:
+            with open(self.path(key, variant), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key, variant, data):
+        temporary = self.path(key, variant) + f'.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, self.path(key, variant))
+
+    def get(self, key, encoding=None):
+        # Returns (body, etag) or None when the entry is missing
+        etag = self.read(key, 'etag')
+        body = self.read(key, encoding or 'identity') if etag else None
+        if body is None:
+            return None
+        return body, etag.decode()
+
+    def store(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        bodies = {'identity': data}
+        for name, encoder in ENCODERS.items():
+            bodies[name] = encoder.compress(data)
+        for variant, body in bodies.items():
+            self.write(key, variant, body)
+        # Written last: an entry only counts as present once its ETag exists
+        etag = hashlib.sha256(data).hexdigest()[:32]
+        self.write(key, 'etag', etag.encode())
+        return bodies, etag
+
+    def invalidate(self, key):
+        for variant in self.variants():
+            try:
+                os.remove(self.path(key, variant))
+            except FileNotFoundError:
+                pass
+
+    def invalidate_prefix(self, prefix):
+        # Removes every entry whose key starts with prefix
+        keys = {
+            os.path.basename(path).rsplit('.', 1)[0]
+            for path in glob.glob(os.path.join(glob.escape(self.directory), glob.escape(prefix) + '*'))
+        }
+        for key in keys:
+            self.invalidate(key)
@@ -0,0 +1,159 @@
+"""
+Streaming exports of mission records.
+
+CSV: one header row (id, created_at, then the data keys) and one row per
+record, values as stored.
+
+Binary (GLBT): a compact little-endian columnar layout for offline analysis.
+
+    header   4s   magic b'GLBT'
+             u16  format version (1)
+             u16  number of value columns C
+             C x (u8 name length, UTF-8 name)
+    blocks   u32  number of rows N in the block (0 ends the stream)
+             N x f64  time, epoch seconds
+             C x (N x f32)  one run per value column, NaN when missing
+
+Blocks let the file be produced while streaming from the database.
+"""
+import csv
+import io
+import struct
+from itertools import islice
+import numpy as np
+from django.db.models.fields.json import KeyTextTransform
+from django.http import StreamingHttpResponse
+from .analysis import time_expression, timestamps_to_epoch, to_float_column
+from .archive import archived_rows, archived_time_window, load_archive
+from .models import Record
+from .records import RecordQueryError, SENSOR_CHANNELS, filter_time_window, parse_fields
+
+MAGIC = b'GLBT'
+VERSION = 1
+CHUNK_SIZE = 5000
+EXPORT_CHANNELS = SENSOR_CHANNELS + ('latitude', 'longitude')
+EXPORT_FORMATS = ('csv', 'binary')
+
+def export_queryset(mission_id, params):
+    queryset = filter_time_window(Record.objects.filter(mission_id=mission_id), params)
+    return queryset.order_by('id')
+
+def iter_chunks(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def csv_columns(fields):
+    return ['timestamp'] + [field for field in fields if field != 'timestamp']
+
+def csv_rows(mission, params, columns):
+    # (id, created_at, value, ...) for each record, from the table or the archive
+    if mission.archived_at:
+        return (
+            (record['id'], record['created_at'], *[record['data'].get(column) for column in columns])
+            for record in archived_time_window(load_archive(mission), params)
+        )
+    return export_queryset(mission.id, params).annotate(
+        **{f'_field_{i}': KeyTextTransform(field, 'data') for i, field in enumerate(columns)}
+    ).values_list('id', 'created_at', *[f'_field_{i}' for i in range(len(columns))]).iterator(chunk_size=CHUNK_SIZE)
+
+def binary_rows(mission, params, fields, time_field='timestamp'):
+    # (time, value, ...) for each record, from the table or the archive
+    if mission.archived_at:
+        return archived_rows(mission, fields, time_field, params)
+    return export_queryset(mission.id, params).annotate(
+        _time=time_expression(time_field),
+        **{f'_field_{i}': KeyTextTransform(field, 'data') for i, field in enumerate(fields)}
+    ).values_list('_time', *[f'_field_{i}' for i in range(len(fields))]).iterator(chunk_size=CHUNK_SIZE)
+
+def stream_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(['id', 'created_at'] + columns)
+    for chunk in iter_chunks(rows):
+        for id, created_at, *values in chunk:
+            writer.writerow([id, created_at.isoformat()] + ['' if value is None else value for value in values])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def binary_header(fields):
+    header = [MAGIC, struct.pack('<HH', VERSION, len(fields))]
+    for field in fields:
+        name = field.encode()
+        header.append(struct.pack('<B', len(name)) + name)
+    return b''.join(header)
+
+def stream_binary(rows, fields, time_field='timestamp'):
+    yield binary_header(fields)
+
+    for chunk in iter_chunks(rows):
+        times = [row[0] for row in chunk]
+        if time_field == 'created_at':
+            t = np.array([value.timestamp() for value in times], dtype='<f8')
+        else:
+            t = timestamps_to_epoch(times).astype('<f8')
+
+        block = [struct.pack('<I', len(chunk)), t.tobytes()]
+        for i in range(len(fields)):
+            column = to_float_column([row[i + 1] for row in chunk]).astype('<f4')
+            block.append(column.tobytes())
+        yield b''.join(block)
+
+    yield struct.pack('<I', 0)
+
+def export_response(mission, export_format, params):
+    if export_format not in EXPORT_FORMATS:
+        raise RecordQueryError(f'export deve ser um de: {", ".join(EXPORT_FORMATS)}')
+
+    fields = parse_fields(params.get('fields')) or list(EXPORT_CHANNELS)
+
+    if export_format == 'csv':
+        columns = csv_columns(fields)
+        response = StreamingHttpResponse(
+            stream_csv(csv_rows(mission, params, columns), columns),
+            content_type='text/csv; charset=utf-8',
+        )
+        extension = 'csv'
+    else:
+        fields = [field for field in fields if field != 'timestamp']
+        time_field = params.get('time_field', 'timestamp')
+        response = StreamingHttpResponse(
+            stream_binary(binary_rows(mission, params, fields, time_field), fields, time_field),
+            content_type='application/octet-stream',
+        )
+        extension = 'glbt'
+
+    response['Content-Disposition'] = f'attachment; filename="mission-{mission.id}.{extension}"'
+    return response
+
+def read_binary(data):
+    # Reference reader, returns (time, {field: values})
+    view = memoryview(data)
+    if bytes(view[:4]) != MAGIC:
+        raise ValueError('Not a GLBT export')
+    version, count = struct.unpack_from('<HH', view, 4)
+    offset = 8
+    fields = []
+    for _ in range(count):
+        length = view[offset]
+        fields.append(bytes(view[offset + 1:offset + 1 + length]).decode())
+        offset += 1 + length
+
+    times, columns = [], {field: [] for field in fields}
+    while True:
+        (rows,) = struct.unpack_from('<I', view, offset)
+        offset += 4
+        if rows == 0:
+            break
+        times.append(np.frombuffer(view, dtype='<f8', count=rows, offset=offset))
+        offset += rows * 8
+        for field in fields:
+            columns[field].append(np.frombuffer(view, dtype='<f4', count=rows, offset=offset))
+            offset += rows * 4
+
+    def join(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return join(times, '<f8'), {field: join(parts, '<f4') for field, parts in columns.items()}
@@ -0,0 +1,30 @@
+from .models import Image
+
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+class ImageQueryError(ValueError):
+    pass
+
+def parse_id(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise ImageQueryError(f'{name} deve ser um número inteiro')
+
+def parse_bool(value, name):
+    try:
+        return BOOLEANS[value.lower()]
+    except KeyError:
+        raise ImageQueryError(f'{name} deve ser true ou false')
+
+def filter_images(params, **filters):
+    # Filters match the (category, active) and (news_article, active)
+    # indexes; the category comes in the same query
+    queryset = Image.objects.select_related('category').filter(**filters)
+    if params.get('category'):
+        queryset = queryset.filter(category_id=parse_id(params['category'], 'category'))
+    if params.get('article'):
+        queryset = queryset.filter(news_article_id=parse_id(params['article'], 'article'))
+    if params.get('active'):
+        queryset = queryset.filter(active=parse_bool(params['active'], 'active'))
+    return queryset.order_by('id')
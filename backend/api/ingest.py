@@ -0,0 +1,150 @@
+import atexit
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from .models import Mission, Record
+from .telemetry import dedup_key
+
+logger = logging.getLogger(__name__)
+
+def make_record(mission_id, data):
+    return Record(mission_id=mission_id, data=data, dedup_key=dedup_key(data))
+
+# Sent after a batch is committed with the finished missions it wrote to:
+# records queued before a mission was closed (another worker's buffer, the
+# async queue, the listener) can land after its close-out.
+late_records_written = Signal()
+
+def write_records(rows):
+    # Every batched ingest path ends here: one transaction per batch of
+    # (mission_id, data) pairs. Packets already stored (retries) are skipped
+    # by the unique (mission, dedup_key) index.
+    rows = list(rows)
+    with transaction.atomic():
+        created = Record.objects.bulk_create(
+            (make_record(mission_id, data) for mission_id, data in rows),
+            ignore_conflicts=True,
+        )
+    finished = list(Mission.objects.filter(id__in={mission_id for mission_id, _ in rows}, end_date__isnull=False))
+    if finished:
+        late_records_written.send(sender=Record, missions=finished)
+    return created
+
+def write_records_one_by_one(rows):
+    # Fallback for a batch that failed as a whole: one bad row (e.g. its
+    # mission was deleted) must not cost the rest. Returns (written, failed).
+    written = failed = 0
+    for mission_id, data in rows:
+        try:
+            write_records([(mission_id, data)])
+            written += 1
+        except Exception:
+            logger.exception('Dropped a record for mission %s', mission_id)
+            failed += 1
+    return written, failed
+
+class RecordWriteBuffer:
+    # Write-behind buffer for realtime telemetry. Records are acknowledged
+    # as soon as they are queued and written in one transaction per batch,
+    # which trades a window of at most ~max_delay seconds of data (lost if
+    # the process dies) for a single fsync per batch instead of per record.
+    def __init__(self):
+        self._pending = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            'enqueued': 0,
+            'flushed': 0,
+            'failed': 0,
+            'flushes': 0,
+            'flush_seconds': 0.0,
+            'max_batch': 0,
+            'max_delay_seconds': 0.0,
+        }
+        atexit.register(self.flush)
+
+    @property
+    def options(self):
+        return getattr(settings, 'RECORD_WRITE_BUFFER', {})
+
+    @property
+    def enabled(self):
+        return self.options.get('enabled', False)
+
+    @property
+    def max_records(self):
+        return self.options.get('max_records', 500)
+
+    @property
+    def max_delay(self):
+        return self.options.get('max_delay_ms', 200) / 1000
+
+    def add(self, mission_id, data):
+        with self._condition:
+            self._pending.append((mission_id, data, time.monotonic()))
+            self._stats['enqueued'] += 1
+            pending = len(self._pending)
+            if pending >= self.max_records:
+                self._condition.notify()
+            self._ensure_thread()
+
+        # Backpressure: if the flusher falls far behind, write in the caller
+        if pending >= self.max_records * 10:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='record-write-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._pending) < self.max_records:
+                    self._condition.wait(self.max_delay)
+            close_old_connections()
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+
+            if not batch:
+                return 0
+
+            start = time.monotonic()
+            rows = [(mission_id, data) for mission_id, data, _ in batch]
+            try:
+                write_records(rows)
+                written, failed = len(rows), 0
+            except Exception:
+                logger.warning('Failed to write %d buffered records, retrying one by one', len(rows), exc_info=True)
+                written, failed = write_records_one_by_one(rows)
+
+            finished = time.monotonic()
+            with self._condition:
+                self._stats['flushed'] += written
+                self._stats['failed'] += failed
+                self._stats['flushes'] += 1
+                self._stats['flush_seconds'] += finished - start
+                self._stats['max_batch'] = max(self._stats['max_batch'], len(batch))
+                self._stats['max_delay_seconds'] = max(
+                    self._stats['max_delay_seconds'], finished - batch[0][2]
+                )
+            return written
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+            stats['oldest_pending_seconds'] = (
+                time.monotonic() - self._pending[0][2] if self._pending else 0.0
+            )
+        return stats
+
+record_buffer = RecordWriteBuffer()
@@ -0,0 +1,236 @@
+"""
+Telemetry listener for the ground station radio link.
+
+Frames are JSON objects, one per UDP datagram or one per line on a stream
+(local socket or serial link). A frame may name its mission with a
+"mission_id" key; otherwise the listener's default mission is used:
+
+    {"mission_id": 4, "timestamp": "2025-04-01T10:00:00", "altitude_m": 812.5}
+
+Decoded records are written with write_records in batches of up to
+batch_size, or after max_delay seconds, whichever comes first.
+
+Frames carry no credentials, so anyone who can reach a socket can write to
+the missions it accepts: bind to localhost, or pass allowed_missions to
+restrict what a listener on a wider network takes.
+"""
+import json
+import logging
+import os
+import selectors
+import socket
+import stat
+import termios
+import time
+import tty
+from django.db import close_old_connections
+from .ingest import write_records, write_records_one_by_one
+from .models import Mission
+from .registry import mission_registry
+from .telemetry import TelemetryError, normalize_record
+
+logger = logging.getLogger(__name__)
+
+MAX_DATAGRAM = 65535
+UDP_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+class LineDecoder:
+    # Splits a byte stream into newline-terminated frames
+    def __init__(self):
+        self.buffer = b''
+
+    def feed(self, data):
+        self.buffer += data
+        *frames, self.buffer = self.buffer.split(b'\n')
+        return frames
+
+class MissionStates:
+    # Missions are read from the database, not the registry: the listener is
+    # its own process and would not see a local cache change. States are
+    # refreshed every `ttl` seconds, so closing a mission takes effect then.
+    def __init__(self, ttl=1.0):
+        self.ttl = ttl
+        self._states = {}
+
+    def accepts(self, mission_id):
+        cached = self._states.get(mission_id)
+        if cached is None or cached[1] <= time.monotonic():
+            try:
+                close_old_connections()
+                cached = (self.load(mission_id), time.monotonic() + self.ttl)
+                self._states[mission_id] = cached
+            except Exception:
+                # A database hiccup must not stop the daemon: go on with the
+                # last known state, or drop the frame if there is none
+                logger.exception('Failed to read the state of mission %s', mission_id)
+                if cached is None:
+                    return False
+        state = cached[0]
+        return state is not None and state['end_date'] is None
+
+    def load(self, mission_id):
+        state = Mission.objects.filter(id=mission_id).values('is_realtime', 'start_date', 'end_date').first()
+        if state and state['is_realtime'] and state['start_date'] is None:
+            state = dict(state, start_date=mission_registry.mark_started(mission_id)['start_date'])
+        return state
+
+class IngestListener:
+    def __init__(self, mission_id=None, batch_size=500, max_delay=0.2, state_ttl=1.0, allowed_missions=None):
+        self.mission_id = mission_id
+        self.allowed_missions = set(allowed_missions) if allowed_missions is not None else None
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.missions = MissionStates(state_ttl)
+        self.selector = selectors.DefaultSelector()
+        self.batch = []
+        self.batch_started = None
+        self.stats = {
+            'frames': 0,
+            'dropped': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+        }
+
+    def add_udp(self, host, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+        sock.bind((host, port))
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ, self._read_datagrams)
+        return sock.getsockname()
+
+    def add_unix(self, path):
+        # A socket left by a previous run is replaced; anything else is not ours
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen()
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, self._accept)
+        return path
+
+    def add_serial(self, path, baudrate=None):
+        # Works for a real serial device or a pty standing in for one
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK | os.O_NOCTTY)
+        tty.setraw(fd)
+        if baudrate:
+            speed = getattr(termios, f'B{baudrate}')
+            attributes = termios.tcgetattr(fd)
+            attributes[4] = attributes[5] = speed
+            termios.tcsetattr(fd, termios.TCSANOW, attributes)
+        self.selector.register(fd, selectors.EVENT_READ, self._stream_reader(fd, LineDecoder()))
+        return path
+
+    def _accept(self, server):
+        connection, _ = server.accept()
+        connection.setblocking(False)
+        self.selector.register(connection, selectors.EVENT_READ, self._stream_reader(connection, LineDecoder()))
+
+    def _stream_reader(self, source, decoder):
+        def read(_):
+            try:
+                data = source.recv(MAX_DATAGRAM) if isinstance(source, socket.socket) else os.read(source, MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b''
+            if not data:
+                self.selector.unregister(source)
+                if isinstance(source, socket.socket):
+                    source.close()
+                else:
+                    os.close(source)
+                return
+            for frame in decoder.feed(data):
+                self.receive(frame)
+        return read
+
+    def _read_datagrams(self, sock):
+        # Drain everything the kernel has queued before going back to select
+        while True:
+            try:
+                frame = sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            self.receive(frame)
+
+    def decode(self, frame):
+        frame = frame.strip()
+        if not frame:
+            return None
+        try:
+            data = json.loads(frame)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        mission_id = data.pop('mission_id', self.mission_id)
+        if not isinstance(mission_id, int) or isinstance(mission_id, bool):
+            return None
+        if self.allowed_missions is not None and mission_id not in self.allowed_missions:
+            return None
+        try:
+            return mission_id, normalize_record(data)
+        except TelemetryError:
+            return None
+
+    def receive(self, frame):
+        self.stats['frames'] += 1
+        record = self.decode(frame)
+        if record is None or not self.missions.accepts(record[0]):
+            self.stats['dropped'] += 1
+            return
+        if not self.batch:
+            self.batch_started = time.monotonic()
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if not batch:
+            return 0
+        try:
+            # The listener runs for days; drop a connection the server closed
+            close_old_connections()
+            write_records(batch)
+            written, failed = len(batch), 0
+        except Exception:
+            logger.warning('Failed to write %d received records, retrying one by one', len(batch), exc_info=True)
+            written, failed = write_records_one_by_one(batch)
+        self.stats['written'] += written
+        self.stats['failed'] += failed
+        self.stats['batches'] += 1
+        return written
+
+    def poll(self, timeout=None):
+        if self.batch:
+            remaining = self.batch_started + self.max_delay - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        for key, _ in self.selector.select(max(timeout, 0) if timeout is not None else None):
+            key.data(key.fileobj)
+        if self.batch and time.monotonic() - self.batch_started >= self.max_delay:
+            self.flush()
+
+    def serve_forever(self, on_idle=None, idle_interval=10.0):
+        next_idle = time.monotonic() + idle_interval
+        while True:
+            self.poll(idle_interval)
+            if on_idle is not None and time.monotonic() >= next_idle:
+                on_idle(self.stats)
+                next_idle = time.monotonic() + idle_interval
+
+    def close(self):
+        self.flush()
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fileobj)
+            if isinstance(key.fileobj, int):
+                os.close(key.fileobj)
+            else:
+                key.fileobj.close()
+        self.selector.close()
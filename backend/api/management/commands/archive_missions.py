@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.archive import archive_candidates, archive_mission, restore_mission
+from api.models import Mission
+
+class Command(BaseCommand):
+    help = 'Moves the records of finished missions into compressed archives, or restores them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS', help='Days since the end date (default RECORD_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--mission', type=int, action='append', help='Only this mission, regardless of age')
+        parser.add_argument('--restore', action='store_true', help='Move archived records back to the records table')
+        parser.add_argument('--dry-run', action='store_true', help='List the missions without changing them')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            if not options['mission']:
+                raise CommandError('--restore requer --mission')
+            missions = Mission.objects.filter(id__in=options['mission'], archived_at__isnull=False)
+        elif options['mission']:
+            missions = Mission.objects.filter(id__in=options['mission'], end_date__isnull=False, archived_at__isnull=True)
+        else:
+            missions = archive_candidates(options['older_than'])
+
+        for mission in missions:
+            if options['dry_run']:
+                self.stdout.write(f'{mission.id} {mission.name}')
+            elif options['restore']:
+                restore_mission(mission)
+                self.stdout.write(f'{mission.id} {mission.name}: restaurada')
+            else:
+                count = archive_mission(mission)
+                self.stdout.write(f'{mission.id} {mission.name}: {count} registos arquivados')
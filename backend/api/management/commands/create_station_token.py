@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.authentication import create_station_token
+from api.models import User
+
+class Command(BaseCommand):
+    help = 'Prints a long-lived API token for a ground station, signed for the given user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user the station acts as')
+        parser.add_argument('--days', type=int, default=365, help='Days until the token expires (default 365)')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days deve ser pelo menos 1')
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f'Utilizador não encontrado: {options["email"]}')
+        self.stdout.write(create_station_token(user, options['days']))
@@ -0,0 +1,63 @@
+import ipaddress
+from django.core.management.base import BaseCommand, CommandError
+from api.listener import IngestListener
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == 'localhost'
+
+class Command(BaseCommand):
+    help = 'Receives ground station telemetry over UDP, a local socket or a serial link and stores it in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--udp', metavar='[HOST:]PORT', help='Listen for UDP datagrams, one frame each (host defaults to 127.0.0.1)')
+        parser.add_argument('--socket', metavar='PATH', help='Listen on a Unix stream socket, one frame per line')
+        parser.add_argument('--serial', metavar='DEVICE', help='Read a serial device or pty, one frame per line')
+        parser.add_argument('--baud', type=int, help='Serial link speed')
+        parser.add_argument('--mission', type=int, help='Mission for frames that do not name one')
+        parser.add_argument('--allow-mission', type=int, action='append', metavar='ID', help='Only accept frames for these missions (required for UDP beyond localhost)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-delay-ms', type=int, default=200)
+        parser.add_argument('--stats-interval', type=float, default=10.0, help='Seconds between statistics lines')
+
+    def handle(self, *args, **options):
+        if not (options['udp'] or options['socket'] or options['serial']):
+            raise CommandError('Indique pelo menos uma fonte: --udp, --socket ou --serial')
+
+        allowed = options['allow_mission']
+        if allowed and options['mission'] is not None:
+            allowed = allowed + [options['mission']]
+        if options['udp']:
+            host, _, port = options['udp'].rpartition(':')
+            host = host or '127.0.0.1'
+            # Frames are not authenticated, so an open port is limited to
+            # the missions named here
+            if not is_loopback(host) and not allowed:
+                raise CommandError('UDP fora de localhost requer --allow-mission')
+
+        listener = IngestListener(
+            mission_id=options['mission'],
+            batch_size=options['batch_size'],
+            max_delay=options['max_delay_ms'] / 1000,
+            allowed_missions=allowed,
+        )
+        if options['udp']:
+            address = listener.add_udp(host, int(port))
+            self.stdout.write(f'UDP em {address[0]}:{address[1]}')
+        if options['socket']:
+            self.stdout.write(f'Socket em {listener.add_unix(options["socket"])}')
+        if options['serial']:
+            self.stdout.write(f'Série em {listener.add_serial(options["serial"], options["baud"])}')
+
+        def report(stats):
+            self.stdout.write(' '.join(f'{key}={value}' for key, value in stats.items()))
+
+        try:
+            listener.serve_forever(report, options['stats_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            report(listener.stats)
@@ -0,0 +1,130 @@
+import hmac
+import threading
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from .ingest import record_buffer
+from .throttling import get_throttle_counters
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+def metrics_enabled():
+    return getattr(settings, 'REQUEST_METRICS_ENABLED', False)
+
+class ViewMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.total_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+class MetricsRegistry:
+    # Per-process accumulator; each worker exposes its own numbers and the
+    # scraper is expected to sum them, as with any Prometheus client.
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, queries, db_seconds, serialize_seconds, total_seconds):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.requests += 1
+            metrics.queries += queries
+            metrics.db_seconds += db_seconds
+            metrics.serialize_seconds += serialize_seconds
+            metrics.total_seconds += total_seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if total_seconds <= bound:
+                    metrics.buckets[i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {
+                    'requests': m.requests,
+                    'queries': m.queries,
+                    'db_seconds': m.db_seconds,
+                    'serialize_seconds': m.serialize_seconds,
+                    'total_seconds': m.total_seconds,
+                    'buckets': list(m.buckets),
+                }
+                for view, m in self._views.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+registry = MetricsRegistry()
+
+def render_prometheus(snapshot, throttle_counters, ingest_stats):
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    simple = [
+        ('api_requests_total', 'requests', 'Requests handled per view.'),
+        ('api_db_queries_total', 'queries', 'SQL queries executed per view.'),
+        ('api_db_seconds_total', 'db_seconds', 'Time spent executing SQL per view.'),
+        ('api_serialize_seconds_total', 'serialize_seconds', 'Time spent rendering responses per view.'),
+    ]
+    for name, key, help_text in simple:
+        family(name, 'counter', help_text)
+        for view, values in sorted(snapshot.items()):
+            lines.append(f'{name}{{view="{view}"}} {values[key]}')
+
+    family('api_request_duration_seconds', 'histogram', 'Total request latency per view.')
+    for view, values in sorted(snapshot.items()):
+        for bound, count in zip(LATENCY_BUCKETS, values['buckets']):
+            lines.append(f'api_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+        lines.append(f'api_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {values["requests"]}')
+        lines.append(f'api_request_duration_seconds_sum{{view="{view}"}} {values["total_seconds"]}')
+        lines.append(f'api_request_duration_seconds_count{{view="{view}"}} {values["requests"]}')
+
+    family('api_throttle_requests_total', 'counter', 'Rate limiter decisions per scope.')
+    for scope, outcomes in sorted(throttle_counters.items()):
+        for outcome, count in sorted(outcomes.items()):
+            lines.append(f'api_throttle_requests_total{{scope="{scope}",outcome="{outcome}"}} {count}')
+
+    ingest = [
+        ('api_ingest_enqueued_total', 'counter', 'enqueued', 'Records accepted by the write buffer.'),
+        ('api_ingest_flushed_total', 'counter', 'flushed', 'Buffered records written to the database.'),
+        ('api_ingest_failed_total', 'counter', 'failed', 'Buffered records dropped because they could not be written.'),
+        ('api_ingest_flushes_total', 'counter', 'flushes', 'Write buffer transactions committed.'),
+        ('api_ingest_flush_seconds_total', 'counter', 'flush_seconds', 'Time spent committing buffered records.'),
+        ('api_ingest_max_batch', 'gauge', 'max_batch', 'Largest batch written so far.'),
+        ('api_ingest_max_delay_seconds', 'gauge', 'max_delay_seconds', 'Longest time a record waited before being committed.'),
+        ('api_ingest_pending', 'gauge', 'pending', 'Records waiting in the write buffer (at risk on a crash).'),
+        ('api_ingest_oldest_pending_seconds', 'gauge', 'oldest_pending_seconds', 'Age of the oldest pending record.'),
+    ]
+    for name, kind, key, help_text in ingest:
+        family(name, kind, help_text)
+        lines.append(f'{name} {ingest_stats[key]}')
+
+    return '\n'.join(lines) + '\n'
+
+def metrics_allowed(request):
+    # With METRICS_TOKEN set the scraper must send it as a Bearer token;
+    # without one only scrapers on the same host are answered
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return request.META.get('REMOTE_ADDR') in LOOPBACK_ADDRESSES
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+def metrics_view(request):
+    if not metrics_enabled():
+        raise Http404()
+    if not metrics_allowed(request):
+        raise PermissionDenied()
+
+    return HttpResponse(
+        render_prometheus(registry.snapshot(), get_throttle_counters(), record_buffer.stats()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
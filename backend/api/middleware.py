@@ -0,0 +1,128 @@
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from .compression import ENCODERS, choose_encoding
+from .metrics import metrics_enabled, registry
+
+COMPRESSED_MEDIA_TYPES = (
+    'image/', 'video/', 'audio/', 'font/woff', 'application/zip', 'application/gzip',
+    'application/x-gzip', 'application/x-bzip2', 'application/x-xz', 'application/x-7z-compressed',
+    'application/zstd', 'application/pdf',
+)
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+class RequestMetricsMiddleware:
+    # Records query count, DB time, render time and total latency per view,
+    # reports them in a Server-Timing header and feeds the /metrics registry.
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        timer = QueryTimer()
+        request._serialize_seconds = 0.0
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+
+        total = time.perf_counter() - start
+        serialize = request._serialize_seconds
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timer.seconds * 1000:.2f};desc="{timer.count} queries"',
+            f'serialize;dur={serialize * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+        registry.observe(self.get_view_name(request), timer.count, timer.seconds, serialize, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; time the rendering
+        start = time.perf_counter()
+
+        def finished(rendered):
+            request._serialize_seconds += time.perf_counter() - start
+
+        response.add_post_render_callback(finished)
+        return response
+
+    def get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        view_class = getattr(match.func, 'view_class', None)
+        if view_class is not None:
+            return view_class.__name__
+        return match.view_name or match._func_path
+
+class CompressionMiddleware:
+    # Negotiated response compression (zstd or brotli when installed, gzip
+    # otherwise) for regular and streaming responses. Responses that are
+    # small, already encoded or of an already compressed media type are
+    # left alone.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if not self.should_compress(request, response):
+            return response
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        encoder = ENCODERS[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = encoder.stream(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 512):
+                return response
+            compressed = encoder.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The body changed, so a strong validator no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        response['Content-Encoding'] = encoding
+        return response
+
+    def should_compress(self, request, response):
+        if request.method == 'HEAD' or response.status_code in (204, 206, 304):
+            return False
+        if response.has_header('Content-Encoding'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        return not content_type.startswith(COMPRESSED_MEDIA_TYPES)
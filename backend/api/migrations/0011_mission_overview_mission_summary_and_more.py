@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_user_reset_token_user_reset_token_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mission',
+            name='overview',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='api.category'),
+        ),
+    ]
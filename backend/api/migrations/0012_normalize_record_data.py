@@ -0,0 +1,115 @@
+import datetime
+import math
+import dateutil.parser
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+
+# A frozen copy of api.telemetry as of this migration, so later changes to
+# ingest validation do not change what this migration does
+SENSOR_CHANNELS = ('temperature_c', 'pressure_hpa', 'humidity_percent', 'altitude_m', 'co2_ppm')
+CHANNEL_RANGES = {
+    **{channel: None for channel in SENSOR_CHANNELS},
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+}
+EPOCH_MILLISECONDS = 1e11
+
+class InvalidRecord(ValueError):
+    pass
+
+def format_timestamp(value):
+    value = value.astimezone(datetime.timezone.utc)
+    return f'{value:%Y-%m-%dT%H:%M:%S}.{value.microsecond // 1000:03d}Z'
+
+def normalize_timestamp(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            seconds = value / 1000 if abs(value) > EPOCH_MILLISECONDS else value
+            return format_timestamp(datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc))
+        except (OSError, OverflowError, ValueError):
+            raise InvalidRecord
+    try:
+        try:
+            parsed = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            parsed = dateutil.parser.isoparse(value)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return format_timestamp(parsed)
+    except (TypeError, ValueError, OverflowError):
+        raise InvalidRecord
+
+def normalize_sequence(value):
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    raise InvalidRecord
+
+def normalize_channel(value, limits):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            number = float(value.strip().replace(',', '.'))
+        except ValueError:
+            raise InvalidRecord
+    elif isinstance(value, (int, float)):
+        number = value
+    else:
+        raise InvalidRecord
+    if not math.isfinite(number):
+        return None
+    if limits is not None and not limits[0] <= number <= limits[1]:
+        raise InvalidRecord
+    return number
+
+def normalize_record(data):
+    if not isinstance(data, dict):
+        raise InvalidRecord
+    record = {}
+    for key, value in data.items():
+        if key == 'timestamp':
+            record[key] = normalize_timestamp(value)
+        elif key == 'seq':
+            record[key] = normalize_sequence(value)
+        elif key in CHANNEL_RANGES:
+            value = normalize_channel(value, CHANNEL_RANGES[key])
+            if value is not None:
+                record[key] = value
+        else:
+            record[key] = value
+    if not record:
+        raise InvalidRecord
+    return record
+
+def normalize_records(apps, schema_editor):
+    # Brings records stored before ingest validation to the cleaned form;
+    # rows that do not validate are left as they are
+    Record = apps.get_model('api', 'Record')
+    changed = []
+    for record in Record.objects.only('id', 'data').iterator(chunk_size=BATCH_SIZE):
+        try:
+            data = normalize_record(record.data)
+        except InvalidRecord:
+            continue
+        if data != record.data:
+            record.data = data
+            changed.append(record)
+        if len(changed) >= BATCH_SIZE:
+            Record.objects.bulk_update(changed, ['data'])
+            changed = []
+    Record.objects.bulk_update(changed, ['data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_mission_overview_mission_summary_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:12
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+def dedup_key(data):
+    # A copy of api.telemetry.dedup_key as of this migration
+    if 'seq' in data:
+        return f'seq:{data["seq"]}'
+    if 'timestamp' in data:
+        return f'ts:{data["timestamp"]}'
+    return None
+
+def fill_dedup_keys(apps, schema_editor):
+    # Existing duplicates are kept, but only the first copy gets the key so
+    # the unique constraint can be created
+    Record = apps.get_model('api', 'Record')
+    seen = set()
+    changed = []
+    for record in Record.objects.only('id', 'mission_id', 'data').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        key = dedup_key(record.data) if isinstance(record.data, dict) else None
+        if key is None or (record.mission_id, key) in seen:
+            continue
+        seen.add((record.mission_id, key))
+        record.dedup_key = key
+        changed.append(record)
+        if len(changed) >= BATCH_SIZE:
+            Record.objects.bulk_update(changed, ['dedup_key'])
+            changed = []
+    Record.objects.bulk_update(changed, ['dedup_key'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_normalize_record_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='dedup_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_dedup_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='record',
+            constraint=models.UniqueConstraint(fields=('mission', 'dedup_key'), name='unique_record_per_mission'),
+        ),
+    ]
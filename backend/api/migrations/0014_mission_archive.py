@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_record_dedup_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mission',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='MissionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('encoding', models.CharField(max_length=16)),
+                ('record_count', models.IntegerField()),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='api.mission')),
+            ],
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# Rebuilds api_record on PostgreSQL as a table partitioned by mission_id, one
+# partition per mission (see api/partitions.py). The primary key has to
+# include the partition key, so it becomes (id, mission_id); ids still come
+# from one sequence and stay unique. Other databases are left as they are.
+
+def partition_records(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Mission = apps.get_model('api', 'Mission')
+    statements = [
+        'ALTER TABLE api_record RENAME TO api_record_unpartitioned',
+        # Renaming a table keeps its index names, which the new table needs
+        'ALTER TABLE api_record_unpartitioned DROP CONSTRAINT IF EXISTS unique_record_per_mission',
+        'ALTER INDEX api_record_pkey RENAME TO api_record_unpartitioned_pkey',
+        'DROP INDEX IF EXISTS api_record_mission_id',
+        'CREATE SEQUENCE api_record_partitioned_id_seq',
+        'CREATE TABLE api_record (LIKE api_record_unpartitioned INCLUDING DEFAULTS) PARTITION BY LIST (mission_id)',
+        "ALTER TABLE api_record ALTER COLUMN id SET DEFAULT nextval('api_record_partitioned_id_seq')",
+        'ALTER TABLE api_record ADD PRIMARY KEY (id, mission_id)',
+        'ALTER TABLE api_record ADD CONSTRAINT unique_record_per_mission UNIQUE (mission_id, dedup_key)',
+        'ALTER TABLE api_record ADD CONSTRAINT api_record_mission_id_fk_api_mission_id '
+        'FOREIGN KEY (mission_id) REFERENCES api_mission (id) DEFERRABLE INITIALLY DEFERRED',
+        'CREATE INDEX api_record_mission_id ON api_record (mission_id)',
+        'CREATE TABLE api_record_default PARTITION OF api_record DEFAULT',
+        *[
+            f'CREATE TABLE api_record_m{mission_id} PARTITION OF api_record FOR VALUES IN ({mission_id})'
+            for mission_id in Mission.objects.values_list('id', flat=True)
+        ],
+        'INSERT INTO api_record SELECT * FROM api_record_unpartitioned',
+        "SELECT setval('api_record_partitioned_id_seq', COALESCE((SELECT MAX(id) FROM api_record), 0) + 1, false)",
+        'ALTER SEQUENCE api_record_partitioned_id_seq OWNED BY api_record.id',
+        'DROP TABLE api_record_unpartitioned',
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+def unpartition_records(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    statements = [
+        'ALTER TABLE api_record RENAME TO api_record_partitioned',
+        'CREATE TABLE api_record (LIKE api_record_partitioned)',
+        'INSERT INTO api_record SELECT * FROM api_record_partitioned',
+        # Drops the partitions and the sequence owned by the partitioned table
+        'DROP TABLE api_record_partitioned CASCADE',
+        'ALTER TABLE api_record ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY',
+        "SELECT setval(pg_get_serial_sequence('api_record', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM api_record",
+        'ALTER TABLE api_record ADD PRIMARY KEY (id)',
+        'ALTER TABLE api_record ADD CONSTRAINT unique_record_per_mission UNIQUE (mission_id, dedup_key)',
+        'ALTER TABLE api_record ADD CONSTRAINT api_record_mission_id_fk_api_mission_id '
+        'FOREIGN KEY (mission_id) REFERENCES api_mission (id) DEFERRABLE INITIALLY DEFERRED',
+        'CREATE INDEX api_record_mission_id ON api_record (mission_id)',
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0014_mission_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_records, unpartition_records),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# Full-text index over news articles, used by api/search.py. Triggers (on
+# SQLite) and a generated column (on PostgreSQL) keep it current on save.
+SQLITE_FORWARD = [
+    '''CREATE VIRTUAL TABLE api_newsarticle_fts USING fts5(
+        title, summary, content,
+        content='api_newsarticle', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER api_newsarticle_fts_insert AFTER INSERT ON api_newsarticle BEGIN
+        INSERT INTO api_newsarticle_fts (rowid, title, summary, content)
+        VALUES (new.id, new.title, new.summary, new.content);
+    END''',
+    '''CREATE TRIGGER api_newsarticle_fts_delete AFTER DELETE ON api_newsarticle BEGIN
+        INSERT INTO api_newsarticle_fts (api_newsarticle_fts, rowid, title, summary, content)
+        VALUES ('delete', old.id, old.title, old.summary, old.content);
+    END''',
+    '''CREATE TRIGGER api_newsarticle_fts_update AFTER UPDATE OF title, summary, content ON api_newsarticle BEGIN
+        INSERT INTO api_newsarticle_fts (api_newsarticle_fts, rowid, title, summary, content)
+        VALUES ('delete', old.id, old.title, old.summary, old.content);
+        INSERT INTO api_newsarticle_fts (rowid, title, summary, content)
+        VALUES (new.id, new.title, new.summary, new.content);
+    END''',
+    "INSERT INTO api_newsarticle_fts (api_newsarticle_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER api_newsarticle_fts_update',
+    'DROP TRIGGER api_newsarticle_fts_delete',
+    'DROP TRIGGER api_newsarticle_fts_insert',
+    'DROP TABLE api_newsarticle_fts',
+]
+
+# PostgreSQL matches SQLite's tokenizer: no stemming ('simple') and accents
+# folded, through translate() since unaccent() cannot be used in a generated
+# column and is not installed everywhere
+FOLD = "translate(lower(coalesce({}, '')), 'àáâãäåāăąçćĉċčèéêëēĕėęěìíîïĩīĭįòóôõöōŏőùúûüũūŭůűųñńņňýÿ', 'aaaaaaaaaccccceeeeeeeeeiiiiiiiioooooooouuuuuuuuuunnnnyy')"
+
+POSTGRES_FORWARD = [
+    f'''ALTER TABLE api_newsarticle ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', {FOLD.format('title')}), 'A') ||
+        setweight(to_tsvector('simple', {FOLD.format('summary')}), 'B') ||
+        setweight(to_tsvector('simple', {FOLD.format('content')}), 'C')
+    ) STORED''',
+    'CREATE INDEX api_newsarticle_search ON api_newsarticle USING GIN (search_vector)',
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX api_newsarticle_search',
+    'ALTER TABLE api_newsarticle DROP COLUMN search_vector',
+]
+
+def run(statements):
+    def operation(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for statement in statements.get(vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_partition_records'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_newsarticle_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['news_article', 'active'], name='image_article_active'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['category', 'active'], name='image_category_active'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='category',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.category'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='news_article',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.newsarticle'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+# Switches a SQLite database to write-ahead logging so readers proceed while
+# a record is being written. The journal mode is stored in the database file,
+# so this only has to happen once rather than on every connection. It cannot
+# change inside a transaction, hence atomic = False. Other databases are left
+# as they are.
+
+def set_journal_mode(mode):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode={mode}')
+    return operation
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0017_image_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_journal_mode('WAL'), set_journal_mode('DELETE')),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from itertools import chain
+from .partitions import create_record_partition, drop_record_partition
 
 class User(models.Model):
     id = models.AutoField(primary_key=True)
@@ -25,16 +26,36 @@ class NewsArticle(models.Model):
     active = models.BooleanField(default=True)
     pinned = models.BooleanField(default=False)
     
+    # What listings show: everything but the article body
+    SUMMARY_FIELDS = ('id', 'title', 'summary', 'published_date', 'active', 'pinned')
+    
     def __str__(self) -> str:
         return self.title
     
     def GetImages(self):
+        if hasattr(self, 'active_images'):
+            return self.active_images
         return Image.objects.filter(news_article=self, active=True) or []
     
     def GetFrontImage(self):
         images = self.GetImages()
         return images[0] if images else None
     
+    @classmethod
+    def WithImages(cls):
+        # Loads every article's active images in one extra query instead of one per article
+        return cls.objects.prefetch_related(
+            models.Prefetch(
+                'image_set',
+                queryset=Image.objects.filter(active=True),
+                to_attr='active_images',
+            )
+        )
+    
+    @classmethod
+    def Summaries(cls):
+        return cls.WithImages().only(*cls.SUMMARY_FIELDS)
+    
     @classmethod
     def GetTopArticles(cls, limit=4):
         pinnedArticles = cls.objects.filter(pinned=True, active=True)
@@ -59,10 +80,17 @@ class Image(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
     image = models.ImageField(upload_to='images/')
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True)
-    news_article = models.ForeignKey(NewsArticle, on_delete=models.SET_NULL, null=True)
+    # Indexed together with active in Meta.indexes
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, db_index=False)
+    news_article = models.ForeignKey(NewsArticle, on_delete=models.SET_NULL, null=True, db_index=False)
     active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['news_article', 'active'], name='image_article_active'),
+            models.Index(fields=['category', 'active'], name='image_category_active'),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -77,15 +105,51 @@ class Mission(models.Model):
     end_date = models.DateTimeField(null=True, blank=True)
     duration = models.DurationField(null=True, blank=True)
     is_realtime = models.BooleanField(default=False)
+    summary = models.JSONField(null=True, blank=True)
+    overview = models.JSONField(null=True, blank=True)
+    # Set while the mission's records live in its MissionArchive
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if adding:
+                create_record_partition(self.id)
+
+    def delete(self, *args, **kwargs):
+        # Dropping the partition removes the records at once, the cascade
+        # then finds none left to delete
+        with transaction.atomic(savepoint=False):
+            drop_record_partition(self.id)
+            return super().delete(*args, **kwargs)
+
 class Record(models.Model):
     id = models.AutoField(primary_key=True)
     data = models.JSONField()
     mission = models.ForeignKey(Mission, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Packet sequence number or timestamp; a retried packet has the same key
+    dedup_key = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mission', 'dedup_key'], name='unique_record_per_mission'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.data}"
+
+class MissionArchive(models.Model):
+    # All records of a finished mission packed into one compressed blob
+    mission = models.OneToOneField(Mission, on_delete=models.CASCADE, related_name='archive')
+    encoding = models.CharField(max_length=16)
+    record_count = models.IntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self) -> str:
-        return f"{self.data}"
\ No newline at end of file
+        return f"{self.mission} ({self.record_count} registos)"
@@ -0,0 +1,51 @@
+from django.db import connection
+
+# On PostgreSQL api_record is partitioned by mission (see migration 0015):
+# each mission's records sit in their own table, so a mission's range scan
+# only touches its pages and dropping a mission drops a table instead of
+# deleting rows. Missions created without a partition (bulk_create, raw
+# SQL) fall into api_record_default. Other databases keep a single table,
+# and these functions do nothing there.
+RECORD_TABLE = 'api_record'
+
+def is_partitioned():
+    return connection.vendor == 'postgresql'
+
+def partition_name(mission_id):
+    return f'{RECORD_TABLE}_m{int(mission_id)}'
+
+def create_partition_sql(mission_id):
+    return (
+        f'CREATE TABLE IF NOT EXISTS {partition_name(mission_id)} '
+        f'PARTITION OF {RECORD_TABLE} FOR VALUES IN ({int(mission_id)})'
+    )
+
+def run_with_checks_settled(cursor, sql):
+    # Records inserted earlier in the same transaction leave deferred foreign
+    # key checks pending, and PostgreSQL refuses DROP or TRUNCATE on a table
+    # with pending trigger events. Running the checks now clears them; Django
+    # creates every foreign key INITIALLY DEFERRED, so that mode is restored.
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    cursor.execute(sql)
+    cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+def create_record_partition(mission_id):
+    if is_partitioned():
+        with connection.cursor() as cursor:
+            cursor.execute(create_partition_sql(mission_id))
+
+def drop_record_partition(mission_id):
+    if is_partitioned():
+        with connection.cursor() as cursor:
+            run_with_checks_settled(cursor, f'DROP TABLE IF EXISTS {partition_name(mission_id)}')
+
+def clear_record_partition(mission_id):
+    # Returns False when the records have to be deleted row by row instead
+    if not is_partitioned():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [partition_name(mission_id)])
+        if cursor.fetchone()[0] is None:
+            return False
+        run_with_checks_settled(cursor, f'TRUNCATE {partition_name(mission_id)}')
+    return True
@@ -0,0 +1,36 @@
+from django.dispatch import receiver
+from .analysis import summarize_mission
+from .archive import missions_channels, restore_mission
+from .export import EXPORT_CHANNELS
+from .ingest import late_records_written, record_buffer
+from .snapshots import invalidate_snapshots, materialize_snapshots
+
+def summarize(mission):
+    invalidate_snapshots(mission.id)
+    t, columns = missions_channels([mission], list(EXPORT_CHANNELS))[mission.id]
+    mission.summary, mission.overview = summarize_mission(t, columns)
+    mission.save(update_fields=['summary', 'overview'])
+
+def close_out_mission(mission):
+    # Runs once when a mission is closed or its log is imported: derived
+    # products go on the mission row and the records are frozen into
+    # snapshots, so later reads never have to scan the raw records.
+    # Records this process still holds in its buffer belong in them.
+    record_buffer.flush()
+    summarize(mission)
+    materialize_snapshots(mission)
+
+@receiver(late_records_written)
+def summarize_late_records(sender, missions, **kwargs):
+    # Snapshots are left to be materialized again on the next read
+    for mission in missions:
+        summarize(mission)
+
+def reopen_mission(mission):
+    # A live mission takes new records, so they go back to the Record table
+    if mission.archived_at:
+        restore_mission(mission)
+    invalidate_snapshots(mission.id)
+    if mission.summary is not None or mission.overview is not None:
+        mission.summary = mission.overview = None
+        mission.save(update_fields=['summary', 'overview'])
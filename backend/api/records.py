@@ -0,0 +1,84 @@
+import re
+import dateutil.parser
+from django.db.models.fields.json import KeyTransform
+from .models import Record
+from .telemetry import SENSOR_CHANNELS, format_timestamp, to_utc
+
+FIELD_NAME = re.compile(r'^[A-Za-z0-9_]+$')
+TIME_FIELDS = ('timestamp', 'created_at')
+
+class RecordQueryError(ValueError):
+    pass
+
+def parse_fields(value):
+    if not value:
+        return None
+
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    for field in fields:
+        if not FIELD_NAME.match(field):
+            raise RecordQueryError(f'Campo inválido: {field}')
+    return fields
+
+def parse_datetime(value, name):
+    try:
+        return dateutil.parser.isoparse(value)
+    except ValueError:
+        raise RecordQueryError(f'Data inválida em {name}: {value}')
+
+def filter_time_window(queryset, params):
+    time_field = params.get('time_field', 'timestamp')
+    if time_field not in TIME_FIELDS:
+        raise RecordQueryError(f'time_field deve ser um de: {", ".join(TIME_FIELDS)}')
+
+    for name, lookup in (('from', 'gte'), ('to', 'lte')):
+        if not params.get(name):
+            continue
+        value = to_utc(parse_datetime(params[name], name))
+
+        if time_field == 'created_at':
+            queryset = queryset.filter(**{f'created_at__{lookup}': value})
+        else:
+            # Timestamps are stored normalized to UTC in a fixed-width ISO
+            # 8601 form (see telemetry), which compares chronologically as text
+            queryset = queryset.filter(**{f'data__timestamp__{lookup}': format_timestamp(value)})
+
+    return queryset
+
+def get_mission_records(mission_id, params):
+    # Filters and projects inside the database: only the requested window
+    # and JSON keys ever leave it.
+    queryset = filter_time_window(Record.objects.filter(mission_id=mission_id), params)
+    fields = parse_fields(params.get('fields'))
+
+    if fields is None:
+        return list(queryset.values('id', 'data', 'created_at'))
+
+    aliases = {f'_field_{i}': field for i, field in enumerate(fields)}
+    rows = queryset.annotate(
+        **{alias: KeyTransform(field, 'data') for alias, field in aliases.items()}
+    ).values('id', 'created_at', *aliases)
+
+    records = []
+    for row in rows:
+        data = {}
+        for alias, field in aliases.items():
+            value = row[alias]
+            if value is not None:
+                data[field] = value
+        records.append({'id': row['id'], 'data': data, 'created_at': row['created_at']})
+    return records
+
+
+def records_payload(records_data):
+    if not records_data:
+        return {
+            'success': True,
+            'message': 'Nenhum registo encontrado para esta missão',
+            'records': []
+        }
+    return {
+        'success': True,
+        'message': 'registos obtidos com sucesso',
+        'records': records_data
+    }
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Mission
+
+# The ground station asks for the current mission and posts records to it
+# several times a second. The registry keeps what those calls need in the
+# cache so that, once warm, they rarely read the mission table. Saving or
+# deleting a mission drops its entries (see the receivers below); entries
+# also expire after STATE_TTL seconds, which bounds how long a worker with
+# its own local cache can act on a change made elsewhere.
+NO_MISSION = 0
+STATE_TTL = 30
+
+class MissionRegistry:
+    def __init__(self, prefix='missions', ttl=STATE_TTL):
+        self.prefix = prefix
+        self.ttl = ttl
+
+    @property
+    def current_key(self):
+        return f'{self.prefix}-current'
+
+    def state_key(self, mission_id):
+        return f'{self.prefix}-state-{mission_id}'
+
+    def state_of(self, mission):
+        return {
+            'id': mission.id,
+            'is_realtime': mission.is_realtime,
+            'start_date': mission.start_date,
+            'end_date': mission.end_date,
+        }
+
+    def get(self, mission_id):
+        # Raises Mission.DoesNotExist like Mission.objects.get
+        state = cache.get(self.state_key(mission_id))
+        if state is None:
+            mission = Mission.objects.get(id=mission_id)
+            state = self.state_of(mission)
+            cache.set(self.state_key(mission_id), state, self.ttl)
+        return state
+
+    def forget(self, mission_id):
+        # Any change can move the current mission, it is looked up again
+        cache.delete_many([self.state_key(mission_id), self.current_key])
+
+    def mark_started(self, mission_id):
+        # Only the first record sets the start; a worker whose state is stale
+        # must not move it
+        start_date = timezone.now()
+        if not Mission.objects.filter(id=mission_id, start_date__isnull=True).update(start_date=start_date):
+            self.forget(mission_id)
+            return self.get(mission_id)
+        state = dict(self.get(mission_id), start_date=start_date)
+        cache.set(self.state_key(mission_id), state, self.ttl)
+        cache.delete(self.current_key)
+        return state
+
+    def current(self):
+        # The current mission is the newest realtime one still waiting for
+        # its first record
+        mission_id = cache.get(self.current_key)
+        if mission_id is None:
+            mission = Mission.objects.filter(start_date__isnull=True, is_realtime=True).last()
+            mission_id = mission.id if mission else NO_MISSION
+            cache.set(self.current_key, mission_id, self.ttl)
+        return mission_id or None
+
+mission_registry = MissionRegistry()
+
+@receiver(post_save, sender=Mission)
+@receiver(post_delete, sender=Mission)
+def forget_mission(sender, instance, **kwargs):
+    mission_registry.forget(instance.id)
@@ -0,0 +1,109 @@
+import re
+from django.db import connection
+
+# News articles are indexed by the database itself (migration 0016): an FTS5
+# table kept in step by triggers on SQLite, a generated tsvector column with
+# a GIN index on PostgreSQL. Either way saving an article only updates that
+# article's entry, and a search reads one page of matches from the index.
+SEARCH_TERM = re.compile(r'\w+')
+# Accent folding for PostgreSQL queries; must match the index in 0016
+FOLD_ACCENTS = str.maketrans(
+    'àáâãäåāăąçćĉċčèéêëēĕėęěìíîïĩīĭįòóôõöōŏőùúûüũūŭůűųñńņňýÿ',
+    'aaaaaaaaaccccceeeeeeeeeiiiiiiiioooooooouuuuuuuuuunnnnyy',
+)
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+# The page is ranked first and snippets are built only for its rows. FTS5
+# functions cannot sit next to a window function, hence the extra nesting.
+SQLITE_SEARCH = '''
+    WITH page AS (
+        SELECT id, published_date, rank, COUNT(*) OVER () AS total
+        FROM (
+            SELECT a.id, a.published_date, bm25(api_newsarticle_fts, 10.0, 5.0, 1.0) AS rank
+            FROM api_newsarticle_fts
+            JOIN api_newsarticle a ON a.id = api_newsarticle_fts.rowid
+            WHERE api_newsarticle_fts MATCH %(query)s AND a.active
+        )
+        ORDER BY rank, published_date DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+    )
+    SELECT page.id, snippet(api_newsarticle_fts, 2, '', '', '…', 24), page.total
+    FROM page
+    JOIN api_newsarticle_fts ON api_newsarticle_fts.rowid = page.id
+    WHERE api_newsarticle_fts MATCH %(query)s
+    ORDER BY page.rank, page.published_date DESC
+'''
+
+POSTGRES_SEARCH = '''
+    WITH page AS (
+        SELECT a.id, a.content, a.published_date, ts_rank_cd(a.search_vector, q) AS rank, COUNT(*) OVER () AS total
+        FROM api_newsarticle a, to_tsquery('simple', %(query)s) q
+        WHERE a.search_vector @@ q AND a.active
+        ORDER BY rank DESC, a.published_date DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+    )
+    SELECT page.id, ts_headline('simple', page.content, q, 'StartSel="", StopSel="", MaxWords=35, MinWords=15'), page.total
+    FROM page, to_tsquery('simple', %(query)s) q
+    ORDER BY page.rank DESC, page.published_date DESC
+'''
+
+# The total comes with the page rows; a page past the last match has none,
+# so the count is then read on its own
+SQLITE_COUNT = '''
+    SELECT COUNT(*)
+    FROM api_newsarticle_fts
+    JOIN api_newsarticle a ON a.id = api_newsarticle_fts.rowid
+    WHERE api_newsarticle_fts MATCH %(query)s AND a.active
+'''
+
+POSTGRES_COUNT = '''
+    SELECT COUNT(*)
+    FROM api_newsarticle a
+    WHERE a.search_vector @@ to_tsquery('simple', %(query)s) AND a.active
+'''
+
+class SearchQueryError(ValueError):
+    pass
+
+def parse_page(params):
+    try:
+        page = int(params.get('page', 1))
+        page_size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise SearchQueryError('page e page_size devem ser números inteiros')
+    if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise SearchQueryError(f'page deve ser >= 1 e page_size entre 1 e {MAX_PAGE_SIZE}')
+    return page, page_size
+
+def fts_query(text):
+    # Every word must match, as a prefix; quoting keeps FTS5 operators and
+    # punctuation in the input from being parsed as query syntax
+    return ' '.join(f'"{term}"*' for term in SEARCH_TERM.findall(text))
+
+def tsquery(text):
+    # The same query for PostgreSQL; terms are word characters only, so they
+    # cannot carry tsquery operators
+    return ' & '.join(f'{term.lower().translate(FOLD_ACCENTS)}:*' for term in SEARCH_TERM.findall(text))
+
+def search_articles(text, page=1, page_size=DEFAULT_PAGE_SIZE):
+    # Returns ([(article_id, snippet), ...], total) for one page of active
+    # articles, best match first
+    if connection.vendor == 'postgresql':
+        sql, count_sql, query = POSTGRES_SEARCH, POSTGRES_COUNT, tsquery(text)
+    else:
+        sql, count_sql, query = SQLITE_SEARCH, SQLITE_COUNT, fts_query(text)
+    if not query.strip():
+        raise SearchQueryError('Indique um termo de pesquisa')
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'query': query, 'limit': page_size, 'offset': (page - 1) * page_size})
+        rows = cursor.fetchall()
+        if rows:
+            total = rows[0][2]
+        elif page > 1:
+            cursor.execute(count_sql, {'query': query})
+            total = cursor.fetchone()[0]
+        else:
+            total = 0
+    return [(id, snippet) for id, snippet, _ in rows], total
@@ -18,6 +18,11 @@ class NewsArticleSerializer(serializers.ModelSerializer):
         if frontImage:
             return frontImage.image.url
         return None
+
+class NewsArticleSummarySerializer(NewsArticleSerializer):
+    # For listings: no content and no author
+    class Meta(NewsArticleSerializer.Meta):
+        fields = [*NewsArticle.SUMMARY_FIELDS, 'main_image']
         
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -25,11 +30,19 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
         
 class ImageSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    
     class Meta:
         model = Image
-        fields = ['id', 'name', 'image', 'category', 'news_article', 'active']
+        fields = ['id', 'name', 'image', 'category', 'category_name', 'news_article', 'active']
 
 class MissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mission
-        fields = ['id', 'name', 'start_date', 'end_date', 'duration', 'is_realtime']
\ No newline at end of file
+        fields = ['id', 'name', 'start_date', 'end_date', 'duration', 'is_realtime', 'summary', 'archived_at']
+        read_only_fields = ['summary', 'archived_at']
+
+class MissionDetailSerializer(MissionSerializer):
+    class Meta(MissionSerializer.Meta):
+        fields = MissionSerializer.Meta.fields + ['overview']
+        read_only_fields = ['summary', 'archived_at', 'overview']
\ No newline at end of file
@@ -0,0 +1,80 @@
+import hashlib
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from .archive import mission_records
+from .compression import PrecompressedCache, choose_encoding
+from .export import EXPORT_CHANNELS, binary_rows, stream_binary
+from .records import records_payload
+
+# Once a mission has an end date its records no longer change, so the full
+# listing (JSON) and the binary export are materialized once, on close or
+# import, and then served straight from disk. Anything that adds records to
+# a finished mission must call invalidate_snapshots. Keys carry the database
+# they were rendered from, so files another database (a test run, say) left
+# in a shared directory are never served for this one.
+SNAPSHOT_KINDS = {
+    'json': 'application/json',
+    'binary': 'application/octet-stream',
+}
+
+snapshot_cache = PrecompressedCache('snapshots')
+
+def database_fingerprint():
+    settings_dict = connection.settings_dict
+    source = f'{connection.vendor}:{settings_dict["HOST"]}:{settings_dict["PORT"]}:{settings_dict["NAME"]}'
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+def snapshot_key(mission_id, kind):
+    return f'mission-{mission_id}-{database_fingerprint()}-{kind}'
+
+def render_snapshot(mission, kind):
+    if kind == 'json':
+        return JSONRenderer().render(records_payload(mission_records(mission, {})))
+
+    fields = [field for field in EXPORT_CHANNELS if field != 'timestamp']
+    return b''.join(stream_binary(binary_rows(mission, {}, fields), fields))
+
+def materialize_snapshots(mission, kinds=SNAPSHOT_KINDS):
+    for kind in kinds:
+        snapshot_cache.store(snapshot_key(mission.id, kind), render_snapshot(mission, kind))
+
+def invalidate_snapshots(mission_id):
+    snapshot_cache.invalidate_prefix(f'mission-{mission_id}-')
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if header.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in candidates
+
+def snapshot_response(request, mission, kind):
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    key = snapshot_key(mission.id, kind)
+
+    entry = snapshot_cache.get(key, encoding)
+    if entry is None:
+        # Serve what was just built: an invalidation may already have
+        # removed it from disk
+        bodies, digest = snapshot_cache.store(key, render_snapshot(mission, kind))
+        entry = bodies[encoding or 'identity'], digest
+    body, digest = entry
+
+    # Each encoding is a different representation and gets its own tag
+    etag = f'"{digest}-{encoding or "identity"}"'
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=SNAPSHOT_KINDS[kind])
+        if encoding is not None:
+            response['Content-Encoding'] = encoding
+        if kind == 'binary':
+            response['Content-Disposition'] = f'attachment; filename="mission-{mission.id}.glbt"'
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
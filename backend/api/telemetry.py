@@ -0,0 +1,123 @@
+import datetime
+import math
+import dateutil.parser
+from django.utils import timezone
+
+# Records are cleaned once, when they are ingested, so readers can take
+# stored values as they are: known channels hold finite numbers and the
+# timestamp is UTC in a fixed-width ISO 8601 form, which sorts
+# chronologically as text. Unknown keys are kept unchanged.
+TIMESTAMP_FIELD = 'timestamp'
+SEQUENCE_FIELD = 'seq'
+SENSOR_CHANNELS = ('temperature_c', 'pressure_hpa', 'humidity_percent', 'altitude_m', 'co2_ppm')
+CHANNEL_RANGES = {
+    **{channel: None for channel in SENSOR_CHANNELS},
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+}
+# Epoch numbers above this are taken as milliseconds
+EPOCH_MILLISECONDS = 1e11
+# Sequence numbers must fit a bigint, which also keeps dedup keys short
+MAX_SEQUENCE = 2 ** 63 - 1
+
+class TelemetryError(ValueError):
+    pass
+
+def format_timestamp(value):
+    value = value.astimezone(datetime.timezone.utc)
+    return f'{value:%Y-%m-%dT%H:%M:%S}.{value.microsecond // 1000:03d}Z'
+
+def to_utc(value):
+    # Naive times are in the server's time zone, as with imported logs
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(datetime.timezone.utc)
+
+def normalize_timestamp(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            # Out-of-range epochs fail with any of these depending on platform
+            seconds = value / 1000 if abs(value) > EPOCH_MILLISECONDS else value
+            return format_timestamp(datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc))
+        except (OSError, OverflowError, ValueError):
+            raise TelemetryError(f'Data inválida em timestamp: {value}')
+    try:
+        # fromisoformat is several times faster and covers what stations send
+        try:
+            parsed = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            parsed = dateutil.parser.isoparse(value)
+        return format_timestamp(to_utc(parsed))
+    except (TypeError, ValueError, OverflowError):
+        raise TelemetryError(f'Data inválida em timestamp: {value}')
+
+def normalize_sequence(value):
+    if isinstance(value, str) and value.strip().isdecimal():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_SEQUENCE:
+        return value
+    raise TelemetryError(f'Número de sequência inválido: {value}')
+
+def compile_channel(name, limits):
+    def convert(value):
+        # Returns None for a missing reading (null, NaN, Inf), which is dropped
+        if value is None or isinstance(value, bool):
+            return None
+        if isinstance(value, str):
+            try:
+                number = float(value.strip().replace(',', '.'))
+            except ValueError:
+                raise TelemetryError(f'Valor inválido em {name}: {value}')
+        elif isinstance(value, (int, float)):
+            number = value
+        else:
+            raise TelemetryError(f'Valor inválido em {name}: {value}')
+
+        if not math.isfinite(number):
+            return None
+        if limits is not None and not limits[0] <= number <= limits[1]:
+            raise TelemetryError(f'{name} fora do intervalo [{limits[0]}, {limits[1]}]: {value}')
+        return number
+    return convert
+
+CONVERTERS = {name: compile_channel(name, limits) for name, limits in CHANNEL_RANGES.items()}
+
+def normalize_record(data):
+    if not isinstance(data, dict):
+        raise TelemetryError('O registo deve ser um objeto JSON')
+
+    record = {}
+    for key, value in data.items():
+        if key == TIMESTAMP_FIELD:
+            record[key] = normalize_timestamp(value)
+        elif key == SEQUENCE_FIELD:
+            record[key] = normalize_sequence(value)
+        elif key in CONVERTERS:
+            value = CONVERTERS[key](value)
+            if value is not None:
+                record[key] = value
+        else:
+            record[key] = value
+
+    if not record:
+        raise TelemetryError('Registo sem dados')
+    return record
+
+def normalize_records(items):
+    # Returns the cleaned records and a list of (index, message) errors
+    records, errors = [], []
+    for i, data in enumerate(items):
+        try:
+            records.append(normalize_record(data))
+        except TelemetryError as e:
+            errors.append((i, str(e)))
+    return records, errors
+
+def dedup_key(data):
+    # Identifies a packet within its mission so retries can be recognized;
+    # records with neither field are never treated as duplicates
+    if SEQUENCE_FIELD in data:
+        return f'seq:{data[SEQUENCE_FIELD]}'
+    if TIMESTAMP_FIELD in data:
+        return f'ts:{data[TIMESTAMP_FIELD]}'
+    return None
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+class _AssertMaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, limit, connection):
+        self.test_case = test_case
+        self.limit = limit
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+
+        executed = len(self)
+        if executed > self.limit:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(self.captured_queries, start=1)
+            )
+            self.test_case.fail(
+                f'{executed} queries executed, budget is {self.limit}:\n{queries}'
+            )
+
+class QueryBudgetMixin:
+    # Like assertNumQueries, but pins an upper bound so unrelated query
+    # savings never break a test while any N+1 regression does.
+    def assertMaxQueries(self, limit, using=DEFAULT_DB_ALIAS):
+        return _AssertMaxQueriesContext(self, limit, connections[using])
+
+class TemporaryStorageMixin:
+    # Points uploads and on-disk caches at a temporary directory that is
+    # emptied before every test, and clears the cache backend, since the
+    # database rollback between tests undoes neither.
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.storage_root = tempfile.mkdtemp()
+        cls.storage_override = override_settings(
+            MEDIA_ROOT=os.path.join(cls.storage_root, 'media'),
+            PRECOMPRESSED_CACHE_DIR=os.path.join(cls.storage_root, 'cache'),
+        )
+        cls.storage_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.storage_override.disable()
+        shutil.rmtree(cls.storage_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(os.path.join(self.storage_root, 'cache'), ignore_errors=True)
+        cache.clear()
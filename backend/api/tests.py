@@ -1,3 +1,1314 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+from . import urls
+from .archive import ArchiveCodecError, unpack_records
+from .async_ingest import AsyncIngestApplication, MissionStateCache
+from .authentication import create_station_token, create_token
+from .export import read_binary
+from .ingest import RecordWriteBuffer, record_buffer, write_records
+from .listener import IngestListener
+from .metrics import registry as metrics_registry
+from .models import *
+from .partitions import create_partition_sql
+from .registry import mission_registry
+from .snapshots import invalidate_snapshots, snapshot_cache, snapshot_key
+from .telemetry import TelemetryError, dedup_key, normalize_record
+from .testing import QueryBudgetMixin, TemporaryStorageMixin
+from .throttling import BucketStore, bucket_store, get_throttle_counters
 
-# Create your tests here.
+ARTICLE_COUNT = 30
+RECORD_COUNT = 500
+
+# Maximum number of queries per endpoint, keyed by route. Every route in
+# api/urls.py must be listed here.
+QUERY_BUDGETS = {
+    'login': 1,
+    'register': 2,
+    'user/<int:user_id>': 1,
+    'reset-password': 2,
+    'verify-reset-token': 1,
+    'complete-reset-password': 2,
+    'newsarticle': 3,
+    'newsarticle/search': 3,
+    'newsarticle/<int:news_article_id>': 2,
+    'newsarticle/create': 4,
+    'newsarticle/update/<int:news_article_id>': 5,
+    'category': 1,
+    'image': 1,
+    'image/article/<int:news_article_id>': 1,
+    'image/create': 5,
+    'image/update/<int:image_id>': 6,
+    'mission': 1,
+    'mission/<int:mission_id>': 1,
+    'mission/create': 3,
+    'mission/<int:mission_id>/update': 6,
+    'mission/<int:mission_id>/records': 2,
+    'mission/<int:mission_id>/records/import': 11,
+    'mission/<int:mission_id>/aggregate': 2,
+    'mission/<int:mission_id>/trajectory': 2,
+    'mission/compare': 2,
+    'mission/current': 1,
+    'mission/<int:mission_id>/add-record': 6,
+    'contact': 0,
+}
+
+def make_image_file(name='image.png'):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (4, 4), color=(255, 0, 0)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+@mock.patch('api.views.verify_recaptcha', return_value=True)
+class QueryBudgetTests(QueryBudgetMixin, TemporaryStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            name='Gleb',
+            email='gleb@glebsat.pt',
+            password='x',
+            reset_token='reset-token',
+            reset_token_expiry=timezone.now() + timezone.timedelta(hours=1),
+        )
+        cls.auth = {'HTTP_AUTHORIZATION': f'Bearer {create_token(cls.user)}'}
+        cls.category = Category.objects.create(name='Lançamentos')
+
+        cls.articles = NewsArticle.objects.bulk_create(
+            NewsArticle(title=f'Notícia {i}', summary='Resumo', content='Texto', author=cls.user)
+            for i in range(ARTICLE_COUNT)
+        )
+        Image.objects.bulk_create(
+            Image(name=f'Imagem {i}', image=f'images/{i}.png', category=cls.category, news_article=article)
+            for i, article in enumerate(cls.articles)
+        )
+        cls.image = Image.objects.first()
+
+        cls.mission = Mission.objects.create(name='Missão', is_realtime=False)
+        Record.objects.bulk_create(
+            Record(mission=cls.mission, data=normalize_record({'timestamp': f'2025-04-01T10:00:{i % 60:02d}', 'altitude_m': i}))
+            for i in range(RECORD_COUNT)
+        )
+        cls.live_mission = Mission.objects.create(name='Missão em tempo real', is_realtime=True)
+
+    def test_every_endpoint_has_a_budget(self, _):
+        routes = {str(pattern.pattern) for pattern in urls.urlpatterns if not str(pattern.pattern).startswith('^')}
+        self.assertEqual(routes - set(QUERY_BUDGETS), set())
+
+    def test_login(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['login']):
+            response = self.client.post(
+                reverse('login'),
+                {'email': self.user.email, 'password': 'wrong', 'recaptcha_token': 'x'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_register(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['register']):
+            response = self.client.post(
+                reverse('register'),
+                {'name': 'Novo', 'email': 'novo@glebsat.pt', 'password': 'password123'},
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+
+    def test_user_get(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['user/<int:user_id>']):
+            response = self.client.get(reverse('user_get', args=[self.user.id]))
+        self.assertTrue(response.json()['success'])
+
+    def test_reset_password(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['reset-password']):
+            response = self.client.post(
+                reverse('reset_password'),
+                {'email': self.user.email, 'name': self.user.name, 'recaptcha_token': 'x'},
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+
+    def test_verify_reset_token(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['verify-reset-token']):
+            response = self.client.post(
+                reverse('verify_reset_token'),
+                {'email': self.user.email, 'token': 'reset-token'},
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+
+    def test_complete_reset_password(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['complete-reset-password']):
+            response = self.client.post(
+                reverse('complete_reset_password'),
+                {'email': self.user.email, 'token': 'reset-token', 'password': 'password123', 'recaptcha_token': 'x'},
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+
+    def test_news_article_list(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['newsarticle']):
+            response = self.client.get(reverse('newsarticle'))
+        articles = response.json()['news_articles']
+        self.assertEqual(len(articles), ARTICLE_COUNT)
+        self.assertTrue(all(article['main_image'] for article in articles))
+        self.assertNotIn('content', articles[0])
+        self.assertNotIn('author', articles[0])
+
+    def test_news_article_search(self, _):
+        NewsArticle.objects.filter(id=self.articles[1].id).update(content='Lançamento do foguetão em Portugal')
+        NewsArticle.objects.filter(id=self.articles[2].id).update(title='Lançamento adiado', active=False)
+        with self.assertMaxQueries(QUERY_BUDGETS['newsarticle/search']):
+            response = self.client.get(reverse('newsarticle_search'), {'q': 'lancamento'})
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['news_articles'][0]['id'], self.articles[1].id)
+        self.assertIn('foguetão', data['news_articles'][0]['snippet'])
+        self.assertTrue(data['news_articles'][0]['main_image'])
+
+        # Title matches rank above body matches; every word has to match
+        self.articles[3].title = 'Notícia sobre o foguetão'
+        self.articles[3].save()
+        data = self.client.get(reverse('newsarticle_search'), {'q': 'foguet'}).json()
+        self.assertEqual([article['id'] for article in data['news_articles']], [self.articles[3].id, self.articles[1].id])
+        data = self.client.get(reverse('newsarticle_search'), {'q': 'foguetão Portugal', 'page_size': 1}).json()
+        self.assertEqual((data['count'], len(data['news_articles'])), (1, 1))
+        # A page past the last match still reports the total
+        with self.assertMaxQueries(QUERY_BUDGETS['newsarticle/search']):
+            data = self.client.get(reverse('newsarticle_search'), {'q': 'foguet', 'page': 5, 'page_size': 1}).json()
+        self.assertEqual((data['count'], data['news_articles']), (2, []))
+
+        self.assertEqual(self.client.get(reverse('newsarticle_search'), {'q': 'texto', 'page_size': 5}).json()['count'], ARTICLE_COUNT - 2)
+        self.assertEqual(self.client.get(reverse('newsarticle_search'), {'q': '"*'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('newsarticle_search'), {'q': 'x', 'page': 0}).status_code, 400)
+
+    def test_news_article_get(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['newsarticle/<int:news_article_id>']):
+            response = self.client.get(reverse('newsarticle_get', args=[self.articles[0].id]))
+        self.assertTrue(response.json()['news_article']['main_image'])
+        self.assertEqual(response.json()['news_article']['content'], 'Texto')
+
+    def test_news_article_create(self, _):
+        data = {'title': 'Nova', 'summary': 'Resumo', 'content': 'Texto', 'author': self.user.id}
+        with self.assertMaxQueries(QUERY_BUDGETS['newsarticle/create']):
+            response = self.client.post(reverse('newsarticle_create'), data, **self.auth)
+        self.assertTrue(response.json()['success'])
+
+    def test_news_article_update(self, _):
+        data = {'title': 'Editada', 'summary': 'Resumo', 'content': 'Texto', 'author': self.user.id}
+        with self.assertMaxQueries(QUERY_BUDGETS['newsarticle/update/<int:news_article_id>']):
+            response = self.client.post(reverse('newsarticle_update', args=[self.articles[0].id]), data, **self.auth)
+        self.assertTrue(response.json()['success'])
+
+    def test_category(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['category']):
+            response = self.client.get(reverse('category'))
+        self.assertTrue(response.json()['success'])
+
+    def test_image_list(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['image']):
+            response = self.client.get(reverse('image'))
+        self.assertEqual(len(response.json()['images']), ARTICLE_COUNT)
+
+    def test_news_article_images(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['image/article/<int:news_article_id>']):
+            response = self.client.get(f'/api/image/article/{self.articles[0].id}')
+        self.assertEqual(len(response.json()['images']), 1)
+        self.assertEqual(response.json()['images'][0]['category_name'], 'Lançamentos')
+
+        Image.objects.filter(news_article=self.articles[0]).update(active=False)
+        self.assertEqual(self.client.get(f'/api/image/article/{self.articles[0].id}').json()['images'], [])
+        response = self.client.get(f'/api/image/article/{self.articles[0].id}', {'active': 'false'})
+        self.assertEqual(len(response.json()['images']), 1)
+        self.assertEqual(self.client.get('/api/image/article/999999').json()['images'], [])
+
+    def test_image_filters(self, _):
+        other = Category.objects.create(name='Equipa')
+        Image.objects.filter(id=self.image.id).update(category=other, active=False)
+        with self.assertMaxQueries(QUERY_BUDGETS['image']):
+            response = self.client.get(reverse('image'), {'category': other.id})
+        self.assertEqual([image['id'] for image in response.json()['images']], [self.image.id])
+        response = self.client.get(reverse('image'), {'category': self.category.id, 'active': 'true'})
+        self.assertEqual(len(response.json()['images']), ARTICLE_COUNT - 1)
+        response = self.client.get(reverse('image'), {'article': self.articles[1].id})
+        self.assertEqual(len(response.json()['images']), 1)
+        self.assertEqual(self.client.get(reverse('image'), {'active': 'talvez'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('image'), {'category': 'x'}).status_code, 400)
+
+    def test_image_create(self, _):
+        data = {'name': 'Nova', 'image': make_image_file(), 'category': self.category.id, 'active': True}
+        with self.assertMaxQueries(QUERY_BUDGETS['image/create']):
+            response = self.client.post(reverse('image_create'), data, **self.auth)
+        self.assertTrue(response.json()['success'])
+
+    def test_image_update(self, _):
+        data = {'name': 'Editada', 'image': make_image_file('other.png'), 'category': self.category.id, 'active': True}
+        with self.assertMaxQueries(QUERY_BUDGETS['image/update/<int:image_id>']):
+            response = self.client.post(reverse('image_update', args=[self.image.id]), data, **self.auth)
+        self.assertTrue(response.json()['success'])
+
+    def test_mission_list(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission']):
+            response = self.client.get(reverse('mission'))
+        self.assertTrue(response.json()['success'])
+
+    def test_mission_get(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>']):
+            response = self.client.get(reverse('mission_get', args=[self.mission.id]))
+        self.assertTrue(response.json()['success'])
+
+    def test_mission_create(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/create']):
+            response = self.client.post(reverse('mission_create'), {'name': 'Nova'}, content_type='application/json', **self.auth)
+        self.assertTrue(response.json()['success'])
+
+    def test_mission_update(self, _):
+        data = {'end_date': '2025-04-01T11:00:00Z', 'duration': '01:00:00'}
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/update']):
+            response = self.client.post(reverse('mission_update', args=[self.mission.id]), data, content_type='application/json', **self.auth)
+        self.assertTrue(response.json()['success'])
+
+    def test_mission_records(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records']):
+            response = self.client.get(reverse('mission_records', args=[self.mission.id]))
+        self.assertEqual(len(response.json()['records']), RECORD_COUNT)
+
+    def test_import_mission_records(self, _):
+        records = [{'data': {'timestamp': f'2025-04-01T10:00:{i:02d}', 'altitude_m': i}} for i in range(50)]
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records/import']):
+            response = self.client.post(
+                reverse('import_mission_records', args=[self.mission.id]),
+                {'records': records},
+                content_type='application/json',
+                **self.auth,
+            )
+        self.assertEqual(response.json()['count'], 50)
+
+    def test_mission_aggregate(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/aggregate']):
+            response = self.client.get(reverse('mission_aggregate', args=[self.mission.id]), {'bucket': '10s'})
+        self.assertTrue(response.json()['success'])
+
+    def test_mission_compare(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/compare']):
+            response = self.client.get(reverse('mission_compare'), {'missions': f'{self.mission.id},{self.live_mission.id}'})
+        self.assertTrue(response.json()['success'])
+
+    def test_current_mission(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/current']):
+            response = self.client.post(reverse('current_mission'))
+        self.assertEqual(response.json()['mission_id'], self.live_mission.id)
+
+    def test_current_mission_from_registry(self, _):
+        self.client.post(reverse('current_mission'))
+        with self.assertMaxQueries(0):
+            response = self.client.post(reverse('current_mission'))
+        self.assertEqual(response.json()['mission_id'], self.live_mission.id)
+
+        # The first record starts the mission, so it stops being current
+        url = reverse('add_mission_record', args=[self.live_mission.id])
+        self.client.post(url, {'altitude_m': 10}, content_type='application/json', **self.auth)
+        # Savepoint, INSERT, release, then the check that the mission was not
+        # closed meanwhile; the registry serves everything else
+        with self.assertMaxQueries(4):
+            response = self.client.post(url, {'altitude_m': 11}, content_type='application/json', **self.auth)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(self.client.post(reverse('current_mission')).status_code, 404)
+
+        self.client.post(
+            reverse('mission_update', args=[self.live_mission.id]),
+            {'end_date': '2025-04-01T11:00:00Z'},
+            content_type='application/json',
+            **self.auth,
+        )
+        response = self.client.post(url, {'altitude_m': 12}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_registry_follows_mission_changes(self, _):
+        url = reverse('add_mission_record', args=[self.live_mission.id])
+        self.client.post(url, {'altitude_m': 10}, content_type='application/json', **self.auth)
+
+        # Saved outside the views, as the admin does
+        mission = Mission.objects.get(id=self.live_mission.id)
+        mission.end_date = timezone.now()
+        mission.save()
+        self.assertEqual(self.client.post(url, {'altitude_m': 11}, content_type='application/json', **self.auth).status_code, 400)
+
+        mission.delete()
+        self.assertEqual(self.client.post(url, {'altitude_m': 12}, content_type='application/json', **self.auth).status_code, 404)
+
+    def test_mark_started_keeps_first_start(self, _):
+        started = timezone.now() - timezone.timedelta(hours=1)
+        mission_registry.get(self.live_mission.id)
+        # Another worker started the mission; this one still has it unstarted
+        Mission.objects.filter(id=self.live_mission.id).update(start_date=started)
+        self.assertEqual(mission_registry.mark_started(self.live_mission.id)['start_date'], started)
+        self.assertEqual(Mission.objects.get(id=self.live_mission.id).start_date, started)
+
+    def test_invalid_telemetry_rejected(self, _):
+        response = self.client.post(
+            reverse('add_mission_record', args=[self.live_mission.id]),
+            {'latitude': 123},
+            content_type='application/json',
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            reverse('add_mission_record', args=[self.live_mission.id]),
+            {'timestamp': 1e20},
+            content_type='application/json',
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            reverse('import_mission_records', args=[self.mission.id]),
+            {'records': [{'data': {'altitude_m': 1}}, {'data': {'altitude_m': 'alto'}}, {'data': {'timestamp': 1e20}}]},
+            content_type='application/json',
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['invalid_count'], 2)
+        self.assertEqual(Record.objects.filter(mission=self.mission).count(), RECORD_COUNT)
+
+    def test_retried_packets_stored_once(self, _):
+        url = reverse('add_mission_record', args=[self.live_mission.id])
+        packet = {'seq': 7, 'altitude_m': 10}
+        first = self.client.post(url, packet, content_type='application/json', **self.auth).json()
+        retry = self.client.post(url, packet, content_type='application/json', **self.auth).json()
+        self.assertIn('record_id', first)
+        self.assertTrue(retry['duplicate'])
+        response = self.client.post(url, {'seq': 10 ** 80}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+        records = [{'data': {'timestamp': f'2025-04-01T10:00:{i:02d}', 'altitude_m': i}} for i in range(10)]
+        import_url = reverse('import_mission_records', args=[self.live_mission.id])
+        self.client.post(import_url, {'records': records[:6]}, content_type='application/json', **self.auth)
+        response = self.client.post(import_url, {'records': records}, content_type='application/json', **self.auth).json()
+        self.assertEqual((response['count'], response['duplicates']), (4, 6))
+        self.assertEqual(Record.objects.filter(mission=self.live_mission).count(), 11)
+
+    def test_record_for_just_closed_mission(self, _):
+        # Another worker closed the mission; this worker's registry still
+        # holds it as open, so the record is stored and the close-out redone
+        url = reverse('add_mission_record', args=[self.live_mission.id])
+        open_state = mission_registry.get(self.live_mission.id)
+        self.client.post(
+            reverse('mission_update', args=[self.live_mission.id]),
+            {'end_date': '2025-04-01T11:00:00Z'},
+            content_type='application/json',
+            **self.auth,
+        )
+        self.assertEqual(Mission.objects.get(id=self.live_mission.id).summary['record_count'], 0)
+
+        with mock.patch('api.views.mission_registry.get', return_value=open_state):
+            response = self.client.post(url, {'timestamp': '2025-04-01T10:59:00Z', 'altitude_m': 10}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Mission.objects.get(id=self.live_mission.id).summary['record_count'], 1)
+        records = self.client.get(reverse('mission_records', args=[self.live_mission.id])).json()['records']
+        self.assertEqual(len(records), 1)
+
+    def test_other_integrity_errors_not_reported_as_duplicates(self, _):
+        url = reverse('add_mission_record', args=[self.live_mission.id])
+        self.client.post(url, {'seq': 1}, content_type='application/json', **self.auth)
+        with mock.patch.object(Record, 'save', side_effect=IntegrityError('CHECK constraint failed')):
+            response = self.client.post(url, {'seq': 2}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn('duplicate', response.json())
+
+        # The insert fails on the foreign key when another worker's registry
+        # still holds a deleted mission
+        Mission.objects.filter(id=self.live_mission.id).delete()
+        with mock.patch.object(Record, 'save', side_effect=IntegrityError('FOREIGN KEY constraint failed')), \
+                mock.patch('api.views.mission_registry.get', return_value={'end_date': None, 'is_realtime': True, 'start_date': timezone.now()}):
+            response = self.client.post(url, {'seq': 1}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 404)
+
+    def test_add_mission_record(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/add-record']):
+            response = self.client.post(
+                reverse('add_mission_record', args=[self.live_mission.id]),
+                {'altitude_m': 10},
+                content_type='application/json',
+                **self.auth,
+            )
+        self.assertTrue(response.json()['success'])
+
+    def test_contact(self, _):
+        with self.assertMaxQueries(QUERY_BUDGETS['contact']):
+            response = self.client.post(
+                reverse('contact'),
+                {'email': 'visitante@example.com', 'message': 'Olá', 'recaptcha_token': 'x'},
+                content_type='application/json',
+            )
+        self.assertTrue(response.json()['success'])
+
+class TokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(name='Gleb', email='gleb@glebsat.pt', password='x')
+        cls.mission = Mission.objects.create(name='Missão')
+
+    def post(self, url, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token is not None else {}
+        return self.client.post(url, {'name': 'Nova'}, content_type='application/json', **headers)
+
+    def test_protected_views_reject_missing_or_invalid_token(self):
+        urls = [
+            reverse('mission_create'),
+            reverse('mission_update', args=[self.mission.id]),
+            reverse('import_mission_records', args=[self.mission.id]),
+            reverse('image_create'),
+            reverse('image_update', args=[1]),
+            reverse('add_mission_record', args=[self.mission.id]),
+        ]
+        for url in urls:
+            self.assertEqual(self.post(url).status_code, 401, url)
+            self.assertEqual(self.post(url, 'invalido').status_code, 401, url)
+        self.assertEqual(Mission.objects.count(), 1)
+
+    def test_expired_token(self):
+        token = create_token(self.user)
+        with override_settings(AUTH_TOKEN_MAX_AGE=-1):
+            response = self.post(reverse('mission_create'), token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'A sessão expirou.')
+        self.assertEqual(self.post(reverse('mission_create'), token).status_code, 200)
+
+    def test_station_token(self):
+        token = create_station_token(self.user, days=30)
+        with override_settings(AUTH_TOKEN_MAX_AGE=-1):
+            self.assertEqual(self.post(reverse('mission_create'), token).status_code, 200)
+
+        with mock.patch('api.authentication.time.time', return_value=datetime.datetime(2100, 1, 1).timestamp()):
+            response = self.post(reverse('mission_create'), token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'A sessão expirou.')
+
+    def test_create_station_token_command(self):
+        out = io.StringIO()
+        call_command('create_station_token', self.user.email, days=7, stdout=out)
+        token = out.getvalue().strip()
+        self.assertEqual(self.post(reverse('mission_create'), token).status_code, 200)
+
+class MissionRecordsQueryTests(QueryBudgetMixin, TemporaryStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(name='Gleb', email='gleb@glebsat.pt', password='x')
+        cls.auth = {'HTTP_AUTHORIZATION': f'Bearer {create_token(cls.user)}'}
+        cls.mission = Mission.objects.create(name='Missão')
+        Record.objects.bulk_create(
+            Record(mission=cls.mission, data=normalize_record({
+                'timestamp': f'2025-04-01T10:{i // 60:02d}:{i % 60:02d}',
+                'altitude_m': i,
+                'latitude': 38.7,
+                'longitude': -9.1,
+                'temperature_c': 20.5,
+            }))
+            for i in range(120)
+        )
+
+    def get_records(self, **params):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records']):
+            response = self.client.get(reverse('mission_records', args=[self.mission.id]), params)
+        return response
+
+    def test_time_window(self):
+        records = self.get_records(**{'from': '2025-04-01T10:00:30', 'to': '2025-04-01T10:01:00'}).json()['records']
+        self.assertEqual([r['data']['altitude_m'] for r in records], list(range(30, 61)))
+
+    def test_field_projection(self):
+        records = self.get_records(fields='latitude,longitude,missing').json()['records']
+        self.assertEqual(len(records), 120)
+        self.assertEqual(records[0]['data'], {'latitude': 38.7, 'longitude': -9.1})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get_records(fields='data") --').status_code, 400)
+        self.assertEqual(self.get_records(**{'from': 'ontem'}).status_code, 400)
+        self.assertEqual(self.get_records(time_field='id').status_code, 400)
+
+    def test_aggregate(self):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/aggregate']):
+            response = self.client.get(
+                reverse('mission_aggregate', args=[self.mission.id]),
+                {'bucket': '1m', 'fields': 'altitude_m,temperature_c', 'agg': 'min,max,avg,count'},
+            )
+        aggregate = response.json()['aggregate']
+        self.assertEqual(aggregate['count'], [60, 60])
+        self.assertEqual(aggregate['series']['altitude_m']['min'], [0, 60])
+        self.assertEqual(aggregate['series']['altitude_m']['max'], [59, 119])
+        self.assertEqual(aggregate['series']['altitude_m']['avg'], [29.5, 89.5])
+        self.assertEqual(aggregate['series']['temperature_c']['count'], [60, 60])
+        self.assertEqual(aggregate['time'][1] - aggregate['time'][0], 60)
+
+    def test_aggregate_by_created_at(self):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/aggregate']):
+            response = self.client.get(
+                reverse('mission_aggregate', args=[self.mission.id]),
+                {'bucket': '1h', 'fields': 'altitude_m', 'agg': 'max', 'time_field': 'created_at'},
+            )
+        self.assertEqual(response.status_code, 200)
+        aggregate = response.json()['aggregate']
+        self.assertEqual(aggregate['count'], [120])
+        self.assertEqual(aggregate['series']['altitude_m']['max'], [119])
+        self.assertAlmostEqual(aggregate['start'], timezone.now().timestamp(), delta=600)
+
+    def test_aggregate_skips_records_without_timestamp(self):
+        other = Mission.objects.create(name='Outra')
+        Record.objects.bulk_create([
+            Record(mission=other, data={'altitude_m': 10}),
+            Record(mission=other, data={'timestamp': '2025-04-01T10:00:00.000Z', 'altitude_m': 20}),
+            Record(mission=other, data={'altitude_m': 30}),
+        ])
+        response = self.client.get(reverse('mission_aggregate', args=[other.id]), {'bucket': '1m', 'fields': 'altitude_m'})
+        aggregate = response.json()['aggregate']
+        self.assertEqual(aggregate['start'], datetime.datetime(2025, 4, 1, 10, tzinfo=datetime.timezone.utc).timestamp())
+        self.assertEqual(aggregate['count'], [1])
+
+        response = self.client.get(reverse('mission_records', args=[other.id]), {'export': 'binary'})
+        t, _ = read_binary(b''.join(response.streaming_content))
+        self.assertEqual(t[1], 1743501600)
+        self.assertTrue(t[0] != t[0] and t[2] != t[2])
+
+    def test_aggregate_invalid_bucket(self):
+        response = self.client.get(reverse('mission_aggregate', args=[self.mission.id]), {'bucket': '10 anos'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_compare(self):
+        other = Mission.objects.create(name='Outra')
+        Record.objects.bulk_create(
+            Record(mission=other, data={'timestamp': f'2025-05-01T09:00:{i:02d}', 'altitude_m': 2 * i})
+            for i in range(31)
+        )
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/compare']):
+            response = self.client.get(
+                reverse('mission_compare'),
+                {'missions': f'{self.mission.id},{other.id}', 'fields': 'altitude_m', 'points': 3},
+            )
+        comparison = response.json()['comparison']
+        self.assertEqual(comparison['grid'], [0, 59.5, 119])
+        self.assertEqual(comparison['values']['altitude_m'], [[0, 59.5, 119], [0, None, None]])
+
+    def test_compare_by_altitude(self):
+        other = Mission.objects.create(name='Outra')
+        Record.objects.bulk_create(
+            Record(mission=other, data={'timestamp': f'2025-05-01T09:00:{i:02d}', 'altitude_m': 4 * i, 'temperature_c': 10})
+            for i in range(31)
+        )
+        response = self.client.get(
+            reverse('mission_compare'),
+            {'missions': f'{self.mission.id},{other.id}', 'fields': 'temperature_c', 'align': 'altitude', 'points': 2},
+        )
+        comparison = response.json()['comparison']
+        self.assertEqual(comparison['grid'], [0, 120])
+        self.assertEqual(comparison['values']['temperature_c'], [[20.5, None], [10, 10]])
+
+    def test_compare_missing_mission(self):
+        response = self.client.get(reverse('mission_compare'), {'missions': f'{self.mission.id},999999'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_csv_export(self):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records']):
+            response = self.client.get(
+                reverse('mission_records', args=[self.mission.id]),
+                {'export': 'csv', 'fields': 'altitude_m,latitude'},
+            )
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,created_at,timestamp,altitude_m,latitude')
+        self.assertEqual(len(lines), 121)
+        self.assertTrue(lines[1].endswith(',2025-04-01T09:00:00.000Z,0,38.7'))
+
+    def test_binary_export(self):
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records']):
+            response = self.client.get(
+                reverse('mission_records', args=[self.mission.id]),
+                {'export': 'binary', 'fields': 'altitude_m,co2_ppm', 'from': '2025-04-01T10:01:00'},
+            )
+            data = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        t, columns = read_binary(data)
+        self.assertEqual(len(t), 60)
+        self.assertEqual(t[1] - t[0], 1)
+        self.assertEqual(columns['altitude_m'].tolist(), list(range(60, 120)))
+        self.assertTrue(all(value != value for value in columns['co2_ppm']))
+
+    def test_binary_export_by_created_at(self):
+        response = self.client.get(
+            reverse('mission_records', args=[self.mission.id]),
+            {'export': 'binary', 'fields': 'altitude_m', 'time_field': 'created_at'},
+        )
+        self.assertEqual(response.status_code, 200)
+        t, columns = read_binary(b''.join(response.streaming_content))
+        self.assertEqual(len(t), 120)
+        self.assertAlmostEqual(t[0], timezone.now().timestamp(), delta=600)
+        self.assertEqual(columns['altitude_m'].tolist(), list(range(120)))
+
+    def test_invalid_export(self):
+        response = self.client.get(reverse('mission_records', args=[self.mission.id]), {'export': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_compressed_response(self):
+        response = self.client.get(reverse('mission_records', args=[self.mission.id]), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['records']), 120)
+
+    def test_compressed_streaming_export(self):
+        response = self.client.get(
+            reverse('mission_records', args=[self.mission.id]),
+            {'export': 'csv'},
+            HTTP_ACCEPT_ENCODING='gzip;q=0.5, identity',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 121)
+
+    def test_finished_mission_snapshot(self):
+        url = reverse('mission_records', args=[self.mission.id])
+        self.client.post(
+            reverse('mission_update', args=[self.mission.id]),
+            {'end_date': '2025-04-01T11:00:00Z'},
+            content_type='application/json',
+            **self.auth,
+        )
+
+        with self.assertMaxQueries(1):
+            first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(first.content))['records']), 120)
+
+        revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        plain = self.client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertNotEqual(plain['ETag'], first['ETag'])
+        self.assertEqual(plain.content, gzip.decompress(first.content))
+
+        with self.assertMaxQueries(1):
+            binary = self.client.get(url, {'export': 'binary'})
+        t, columns = read_binary(binary.content)
+        self.assertEqual(len(t), 120)
+
+        self.client.post(
+            reverse('import_mission_records', args=[self.mission.id]),
+            {'records': [{'data': {'timestamp': '2025-04-01T11:00:00', 'altitude_m': 500}}]},
+            content_type='application/json',
+            **self.auth,
+        )
+        refreshed = self.client.get(url, HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(len(refreshed.json()['records']), 121)
+
+    def test_snapshot_materialized_lazily(self):
+        self.mission.end_date = timezone.now()
+        self.mission.save()
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records']):
+            response = self.client.get(reverse('mission_records', args=[self.mission.id]))
+        self.assertEqual(len(response.json()['records']), 120)
+
+    def test_snapshot_invalidated_while_materializing(self):
+        self.mission.end_date = timezone.now()
+        self.mission.save()
+        store = snapshot_cache.store
+
+        def store_then_invalidate(key, data):
+            # A late record lands right after the snapshot is written
+            stored = store(key, data)
+            invalidate_snapshots(self.mission.id)
+            return stored
+
+        with mock.patch.object(snapshot_cache, 'store', side_effect=store_then_invalidate):
+            response = self.client.get(reverse('mission_records', args=[self.mission.id]), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['records']), 120)
+
+    def test_snapshot_from_other_database_not_served(self):
+        self.mission.end_date = timezone.now()
+        self.mission.save()
+        url = reverse('mission_records', args=[self.mission.id])
+        # Another database with a finished mission under the same id
+        with mock.patch.dict(connection.settings_dict, NAME='other'):
+            snapshot_cache.store(snapshot_key(self.mission.id, 'json'), b'{"records": []}')
+        self.assertEqual(len(self.client.get(url).json()['records']), 120)
+
+        invalidate_snapshots(self.mission.id)
+        self.assertEqual(os.listdir(snapshot_cache.directory), [])
+
+    def test_close_out_summary(self):
+        self.client.post(
+            reverse('mission_update', args=[self.mission.id]),
+            {'end_date': '2025-04-01T11:00:00Z'},
+            content_type='application/json',
+            **self.auth,
+        )
+
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>']):
+            mission = self.client.get(reverse('mission_get', args=[self.mission.id])).json()['mission']
+        summary = mission['summary']
+        self.assertEqual(summary['record_count'], 120)
+        self.assertEqual(summary['duration_seconds'], 119)
+        self.assertEqual(summary['max_altitude_m'], 119)
+        self.assertEqual(summary['ascent_rate_m_s'], 1)
+        self.assertEqual(summary['ground_track_m'], 0)
+        self.assertEqual(summary['channels']['temperature_c']['mean'], 20.5)
+        self.assertEqual(summary['channels']['co2_ppm']['count'], 0)
+        self.assertLessEqual(len(mission['overview']['time']), 200)
+
+        missions = self.client.get(reverse('mission')).json()['missions']
+        self.assertNotIn('overview', missions[0])
+        self.assertEqual(missions[0]['summary']['record_count'], 120)
+
+        self.client.post(reverse('mission_update', args=[self.mission.id]), {'end_date': None}, content_type='application/json', **self.auth)
+        self.assertIsNone(Mission.objects.get(id=self.mission.id).summary)
+
+    def test_close_out_includes_buffered_records(self):
+        # Never leave a record for the exit-time flush to write elsewhere
+        self.addCleanup(record_buffer.flush)
+        with self.settings(RECORD_WRITE_BUFFER={'enabled': True, 'max_records': 500, 'max_delay_ms': 60000}):
+            record_buffer.add(self.mission.id, {'timestamp': '2025-04-01T10:02:00.000Z', 'altitude_m': 120})
+            self.client.post(
+                reverse('mission_update', args=[self.mission.id]),
+                {'end_date': '2025-04-01T11:00:00Z'},
+                content_type='application/json',
+                **self.auth,
+            )
+        self.assertEqual(Mission.objects.get(id=self.mission.id).summary['record_count'], 121)
+        self.assertEqual(len(self.client.get(reverse('mission_records', args=[self.mission.id])).json()['records']), 121)
+
+    def test_late_records_refresh_close_out(self):
+        url = reverse('mission_records', args=[self.mission.id])
+        self.client.post(
+            reverse('mission_update', args=[self.mission.id]),
+            {'end_date': '2025-04-01T11:00:00Z'},
+            content_type='application/json',
+            **self.auth,
+        )
+        self.assertEqual(len(self.client.get(url).json()['records']), 120)
+
+        # Queued elsewhere before the close, written after it
+        write_records([(self.mission.id, {'timestamp': '2025-04-01T10:02:00.000Z', 'altitude_m': 120})])
+        self.assertEqual(Mission.objects.get(id=self.mission.id).summary['record_count'], 121)
+        self.assertEqual(len(self.client.get(url).json()['records']), 121)
+
+    def test_trajectory(self):
+        url = reverse('mission_trajectory', args=[self.mission.id])
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/trajectory']):
+            full = self.client.get(url, {'tolerance': '0'}).json()['trajectory']
+        self.assertEqual(len(full['points']), 120)
+
+        # Every fix is at the same place, only the ends survive
+        simplified = self.client.get(url, {'tolerance': '7'}).json()['trajectory']
+        self.assertEqual(simplified['tolerance'], 5)
+        self.assertEqual(simplified['point_count'], 120)
+        self.assertEqual(simplified['points'], [[38.7, -9.1], [38.7, -9.1]])
+
+        self.assertEqual(self.client.get(url, {'tolerance': '-1'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'tolerance': 'nan'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'tolerance': 'inf'}).status_code, 400)
+
+    def test_trajectory_cached_for_finished_mission(self):
+        self.client.post(
+            reverse('mission_update', args=[self.mission.id]),
+            {'end_date': '2025-04-01T11:00:00Z'},
+            content_type='application/json',
+            **self.auth,
+        )
+        url = reverse('mission_trajectory', args=[self.mission.id])
+        first = self.client.get(url).json()
+        with self.assertMaxQueries(1):
+            second = self.client.get(url).json()
+        self.assertEqual(first, second)
+
+        # Nothing is deleted from the cache (another worker's would keep its
+        # entry), yet the late record changes the key
+        write_records([(self.mission.id, {'timestamp': '2025-04-01T10:02:00.000Z', 'latitude': 38.8, 'longitude': -9.2})])
+        third = self.client.get(url).json()['trajectory']
+        self.assertEqual(third['point_count'], 121)
+        self.assertEqual(third['points'][-1], [38.8, -9.2])
+
+    def test_archived_mission(self):
+        self.mission.end_date = timezone.now() - datetime.timedelta(days=40)
+        self.mission.save()
+        hot = self.get_records().json()['records']
+        call_command('archive_missions', stdout=io.StringIO())
+        self.mission.refresh_from_db()
+
+        self.assertIsNotNone(self.mission.archived_at)
+        self.assertFalse(Record.objects.filter(mission=self.mission).exists())
+        archive = MissionArchive.objects.get(mission=self.mission)
+        self.assertEqual((archive.record_count, archive.encoding), (120, 'gzip'))
+        with mock.patch.dict('api.archive.ENCODERS', {}, clear=True):
+            with self.assertRaisesMessage(ArchiveCodecError, "'zstandard'"):
+                unpack_records(archive.data, 'zstd')
+
+        self.assertEqual(self.get_records(time_field='timestamp').json()['records'], hot)
+        records = self.get_records(**{'from': '2025-04-01T10:00:30', 'to': '2025-04-01T10:01:00'}).json()['records']
+        self.assertEqual([r['data']['altitude_m'] for r in records], list(range(30, 61)))
+        records = self.get_records(fields='latitude,missing').json()['records']
+        self.assertEqual(records[0]['data'], {'latitude': 38.7})
+
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/records']):
+            response = self.client.get(
+                reverse('mission_records', args=[self.mission.id]),
+                {'export': 'csv', 'fields': 'altitude_m,latitude'},
+            )
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 121)
+        self.assertTrue(lines[1].endswith(',2025-04-01T09:00:00.000Z,0,38.7'))
+
+        with self.assertMaxQueries(QUERY_BUDGETS['mission/<int:mission_id>/aggregate']):
+            response = self.client.get(
+                reverse('mission_aggregate', args=[self.mission.id]),
+                {'bucket': '1m', 'fields': 'altitude_m', 'agg': 'max', 'from': '2025-04-01T10:00:30'},
+            )
+        self.assertEqual(response.json()['aggregate']['series']['altitude_m']['max'], [89, 119])
+        self.assertEqual(response.json()['aggregate']['count'], [60, 30])
+        trajectory = self.client.get(reverse('mission_trajectory', args=[self.mission.id])).json()['trajectory']
+        self.assertEqual(trajectory['point_count'], 120)
+
+        # Reopening the mission brings the records back
+        self.client.post(reverse('mission_update', args=[self.mission.id]), {'end_date': None}, content_type='application/json', **self.auth)
+        self.mission.refresh_from_db()
+        self.assertIsNone(self.mission.archived_at)
+        self.assertFalse(MissionArchive.objects.filter(mission=self.mission).exists())
+        self.assertEqual(self.get_records().json()['records'], hot)
+
+    def test_delete_mission(self):
+        self.assertEqual(
+            create_partition_sql(self.mission.id),
+            f'CREATE TABLE IF NOT EXISTS api_record_m{self.mission.id} PARTITION OF api_record FOR VALUES IN ({self.mission.id})',
+        )
+        other = Mission.objects.create(name='Outra')
+        Record.objects.create(mission=other, data={'altitude_m': 1})
+        self.mission.delete()
+        self.assertEqual(list(Record.objects.values_list('mission_id', flat=True)), [other.id])
+
+class AsyncIngestTests(TemporaryStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(name='Gleb', email='gleb@glebsat.pt', password='x')
+        cls.token = create_token(cls.user)
+        cls.mission = Mission.objects.create(name='Missão em tempo real', is_realtime=True)
+
+    def setUp(self):
+        super().setUp()
+        # The writer would close the test's connection, which holds the test
+        # transaction; Django's test client skips close_old_connections too
+        patcher = mock.patch('api.async_ingest.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fallback = mock.AsyncMock()
+        self.application = AsyncIngestApplication(self.fallback)
+
+    async def post(self, path, body, token=None):
+        headers = [(b'authorization', f'Bearer {token or self.token}'.encode())]
+        scope = {'type': 'http', 'method': 'POST', 'path': path, 'headers': headers}
+        receive = mock.AsyncMock(return_value={'type': 'http.request', 'body': body, 'more_body': False})
+        send = mock.AsyncMock()
+        await self.application(scope, receive, send)
+        start, message = [call.args[0] for call in send.await_args_list]
+        return start['status'], json.loads(message['body'])
+
+    async def test_records_written_in_batches(self):
+        path = f'/api/mission/{self.mission.id}/ingest'
+        results = await asyncio.gather(*[
+            self.post(path, json.dumps({'altitude_m': i}).encode()) for i in range(50)
+        ])
+        self.assertEqual({status for status, _ in results}, {202})
+
+        await self.application.queue.close()
+        self.assertEqual(await Record.objects.filter(mission=self.mission).acount(), 50)
+        stats = self.application.queue.stats()
+        self.assertEqual(stats['written'], 50)
+        self.assertLess(stats['batches'], 50)
+        self.fallback.assert_not_awaited()
+
+    async def test_rejected_requests(self):
+        path = f'/api/mission/{self.mission.id}/ingest'
+        self.assertEqual((await self.post(path, b'{"a": 1}', token='x'))[0], 401)
+        self.assertEqual((await self.post(path, b'not json'))[0], 400)
+        self.assertEqual((await self.post(path, b'{}'))[0], 400)
+        self.assertEqual((await self.post('/api/mission/999/ingest', b'{"a": 1}'))[0], 404)
+
+    async def test_full_queue_applies_backpressure(self):
+        path = f'/api/mission/{self.mission.id}/ingest'
+        released = threading.Event()
+        options = {'max_queue': 1, 'max_records': 1, 'enqueue_timeout_ms': 1}
+        # The database stalls, so once the writer holds one record and the
+        # queue holds another, further records are turned away
+        with self.settings(ASYNC_INGEST=options), \
+                mock.patch('api.async_ingest.write_records', side_effect=lambda batch: released.wait(5)):
+            statuses = [(await self.post(path, b'{"a": 1}'))[0] for _ in range(5)]
+            released.set()
+            await self.application.queue.close()
+        self.assertEqual(statuses[0], 202)
+        self.assertIn(503, statuses)
+        self.assertEqual(self.application.queue.stats()['rejected'], statuses.count(503))
+
+    async def test_bad_row_does_not_fail_batch(self):
+        def write(rows):
+            if any(data.get('altitude_m') == 2 for _, data in rows):
+                raise IntegrityError('bad row')
+            return write_records(rows)
+
+        path = f'/api/mission/{self.mission.id}/ingest'
+        with mock.patch('api.async_ingest.write_records', side_effect=write), \
+                mock.patch('api.ingest.write_records', side_effect=write), \
+                self.assertLogs('api', 'WARNING'):
+            for i in range(4):
+                await self.post(path, json.dumps({'altitude_m': i}).encode())
+            await self.application.queue.close()
+        stats = self.application.queue.stats()
+        self.assertEqual((stats['written'], stats['failed']), (3, 1))
+        self.assertEqual(await Record.objects.filter(mission=self.mission).acount(), 3)
+
+    async def test_disconnect_is_not_payload_too_large(self):
+        path = f'/api/mission/{self.mission.id}/ingest'
+        scope = {'type': 'http', 'method': 'POST', 'path': path, 'headers': [(b'authorization', f'Bearer {self.token}'.encode())]}
+        send = mock.AsyncMock()
+        await self.application(scope, mock.AsyncMock(return_value={'type': 'http.disconnect'}), send)
+        send.assert_not_awaited()
+
+        with self.settings(ASYNC_INGEST={'max_body_bytes': 8}):
+            self.assertEqual((await self.post(path, b'{"altitude_m": 1}'))[0], 413)
+
+    async def test_mission_states_bounded(self):
+        missions = MissionStateCache(max_states=2)
+        with mock.patch.object(missions, '_load', side_effect=lambda mission_id: mission_id):
+            for mission_id in range(5):
+                self.assertEqual(await missions.get(mission_id), mission_id)
+        self.assertEqual(list(missions._states), [3, 4])
+
+    async def test_other_requests_go_to_django(self):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/mission', 'headers': []}
+        await self.application(scope, None, None)
+        self.fallback.assert_awaited_once_with(scope, None, None)
+
+class IngestListenerTests(TemporaryStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mission = Mission.objects.create(name='Missão em tempo real', is_realtime=True)
+        cls.closed = Mission.objects.create(name='Missão terminada', end_date=timezone.now())
+
+    def setUp(self):
+        super().setUp()
+        # See AsyncIngestTests.setUp
+        patcher = mock.patch('api.listener.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.listener = IngestListener(mission_id=self.mission.id, batch_size=10, max_delay=60)
+        self.addCleanup(self.listener.close)
+
+    def poll_until(self, frames):
+        for _ in range(100):
+            if self.listener.stats['frames'] >= frames:
+                return
+            self.listener.poll(0.05)
+        self.fail(f'Only {self.listener.stats["frames"]} of {frames} frames arrived')
+
+    def test_udp_frames_written_in_batches(self):
+        address = self.listener.add_udp('127.0.0.1', 0)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(sender.close)
+        for i in range(25):
+            sender.sendto(json.dumps({'altitude_m': i}).encode(), address)
+        sender.sendto(b'not json', address)
+        sender.sendto(json.dumps({'timestamp': 1e20}).encode(), address)
+        sender.sendto(json.dumps({'mission_id': self.closed.id, 'altitude_m': 1}).encode(), address)
+
+        self.poll_until(28)
+        self.assertEqual(self.listener.stats['batches'], 2)
+        self.listener.flush()
+        self.assertEqual(self.listener.stats['dropped'], 3)
+        self.assertEqual(Record.objects.filter(mission=self.mission).count(), 25)
+        self.assertIsNotNone(Mission.objects.get(id=self.mission.id).start_date)
+
+    def test_serial_frames_split_across_reads(self):
+        controller, device = os.openpty()
+        self.addCleanup(os.close, controller)
+        self.addCleanup(os.close, device)
+        self.listener.add_serial(os.ttyname(device))
+
+        os.write(controller, b'{"altitude_m": 1}\n{"altitu')
+        self.poll_until(1)
+        os.write(controller, b'de_m": 2}\n')
+        self.poll_until(2)
+        self.listener.flush()
+        self.assertEqual(
+            sorted(Record.objects.filter(mission=self.mission).values_list('data__altitude_m', flat=True)),
+            [1, 2],
+        )
+
+    def test_unix_socket(self):
+        path = os.path.join(tempfile.mkdtemp(dir=self.storage_root), 'ingest.sock')
+        self.listener.add_unix(path)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(client.close)
+        client.connect(path)
+        client.sendall(b''.join(json.dumps({'altitude_m': i}).encode() + b'\n' for i in range(5)))
+
+        self.poll_until(5)
+        self.listener.flush()
+        self.assertEqual(Record.objects.filter(mission=self.mission).count(), 5)
+
+    def test_rejected_frames(self):
+        listener = IngestListener(mission_id=self.mission.id, allowed_missions=[self.mission.id])
+        self.addCleanup(listener.close)
+        listener.receive(json.dumps({'mission_id': True, 'altitude_m': 1}).encode())
+        listener.receive(json.dumps({'mission_id': self.closed.id + 100, 'altitude_m': 1}).encode())
+        listener.receive(json.dumps({'altitude_m': 1}).encode())
+        self.assertEqual((listener.stats['dropped'], len(listener.batch)), (2, 1))
+
+    def test_bad_row_does_not_fail_batch(self):
+        def write(rows):
+            if any(data.get('altitude_m') == 2 for _, data in rows):
+                raise IntegrityError('bad row')
+            return write_records(rows)
+
+        for i in range(3):
+            self.listener.receive(json.dumps({'altitude_m': i}).encode())
+        with mock.patch('api.listener.write_records', side_effect=write), \
+                mock.patch('api.ingest.write_records', side_effect=write), \
+                self.assertLogs('api', 'WARNING'):
+            self.assertEqual(self.listener.flush(), 2)
+        self.assertEqual((self.listener.stats['written'], self.listener.stats['failed']), (2, 1))
+        self.assertEqual(Record.objects.filter(mission=self.mission).count(), 2)
+
+    def test_database_errors_keep_listening(self):
+        listener = IngestListener(mission_id=self.mission.id, state_ttl=0)
+        self.addCleanup(listener.close)
+        frame = json.dumps({'altitude_m': 1}).encode()
+        with mock.patch.object(listener.missions, 'load', side_effect=OperationalError('gone')), \
+                self.assertLogs('api.listener', 'ERROR'):
+            listener.receive(frame)
+        self.assertEqual(listener.stats['dropped'], 1)
+
+        # Once a state is known, it carries the listener through an outage
+        listener.receive(frame)
+        with mock.patch.object(listener.missions, 'load', side_effect=OperationalError('gone')), \
+                self.assertLogs('api.listener', 'ERROR'):
+            listener.receive(frame)
+        self.assertEqual(len(listener.batch), 2)
+
+    def test_unix_socket_path_not_a_socket(self):
+        path = os.path.join(tempfile.mkdtemp(dir=self.storage_root), 'ingest.sock')
+        with open(path, 'w') as f:
+            f.write('dados')
+        with self.assertRaises(OSError):
+            self.listener.add_unix(path)
+        with open(path) as f:
+            self.assertEqual(f.read(), 'dados')
+
+    def test_open_udp_requires_allowlist(self):
+        with self.assertRaisesMessage(CommandError, '--allow-mission'):
+            call_command('ingest_listener', udp='0.0.0.0:0')
+
+class TelemetryTests(TestCase):
+    def test_normalize_record(self):
+        record = normalize_record({
+            'timestamp': '2025-04-01T10:00:00.25+01:00',
+            'temperature_c': '20,5',
+            'pressure_hpa': 'NaN',
+            'humidity_percent': float('inf'),
+            'altitude_m': 812,
+            'co2_ppm': None,
+            'battery': 'ok',
+        })
+        self.assertEqual(record, {
+            'timestamp': '2025-04-01T09:00:00.250Z',
+            'temperature_c': 20.5,
+            'altitude_m': 812,
+            'battery': 'ok',
+        })
+
+    def test_timestamps(self):
+        # Naive times are local (Europe/Lisbon), epoch numbers in s or ms
+        self.assertEqual(normalize_record({'timestamp': '2025-01-01T10:00:00'})['timestamp'], '2025-01-01T10:00:00.000Z')
+        self.assertEqual(normalize_record({'timestamp': 1743501600})['timestamp'], '2025-04-01T10:00:00.000Z')
+        self.assertEqual(normalize_record({'timestamp': 1743501600500})['timestamp'], '2025-04-01T10:00:00.500Z')
+
+    def test_invalid_records(self):
+        for data in ({'altitude_m': 'alto'}, {'latitude': 91}, {'timestamp': 'ontem'}, {'co2_ppm': None}, [1, 2]):
+            with self.assertRaises(TelemetryError):
+                normalize_record(data)
+
+    def test_sequence_numbers(self):
+        self.assertEqual(normalize_record({'seq': ' 42 '})['seq'], 42)
+        self.assertEqual(dedup_key(normalize_record({'seq': 2 ** 63 - 1})), f'seq:{2 ** 63 - 1}')
+        for seq in (-1, 2 ** 63, 10 ** 80, str(10 ** 80), '²', True, 1.5):
+            with self.assertRaises(TelemetryError):
+                normalize_record({'seq': seq})
+
+    def test_out_of_range_timestamps(self):
+        for timestamp in (1e20, -1e20, 10 ** 400, float('nan'), '0001-01-01T00:00:00+01:00'):
+            with self.assertRaises(TelemetryError):
+                normalize_record({'timestamp': timestamp})
+
+@mock.patch('api.views.verify_recaptcha', return_value=True)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        bucket_store.clear()
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'login': '2/minute'}})
+    def test_login_throttled(self, _):
+        data = {'recaptcha_token': 'x', 'email': 'gleb@glebsat.pt', 'password': 'x'}
+        for i in range(2):
+            self.assertNotEqual(self.client.post(reverse('login'), data).status_code, 429)
+        response = self.client.post(reverse('login'), data)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertGreaterEqual(get_throttle_counters()['login']['throttled'], 1)
+
+    def test_bucket_refills(self, _):
+        store = BucketStore()
+        with mock.patch('api.throttling.time.time', return_value=1000.0):
+            self.assertEqual([store.take('refill', 2, 1 / 30)[0] for _ in range(3)], [True, True, False])
+            self.assertAlmostEqual(store.take('refill', 2, 1 / 30)[1], 30)
+        with mock.patch('api.throttling.time.time', return_value=1030.0):
+            self.assertEqual([store.take('refill', 2, 1 / 30)[0] for _ in range(2)], [True, False])
+
+    def test_falls_back_when_cache_unreachable(self, _):
+        broken = mock.Mock()
+        broken.get.side_effect = ConnectionError
+        store = BucketStore()
+        with mock.patch('api.throttling.caches', {'default': broken}):
+            self.assertEqual([store.take('fallback', 2, 1 / 60)[0] for _ in range(3)], [True, True, False])
+        self.assertIn('fallback', store._local)
+
+    def test_concurrent_takes_share_bucket(self, _):
+        store = BucketStore()
+        results = []
+        barrier = threading.Barrier(8)
+
+        def take():
+            barrier.wait()
+            for _ in range(10):
+                results.append(store.take('concurrent', 20, 1 / 3600)[0])
+
+        threads = [threading.Thread(target=take) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 20)
+
+@override_settings(REQUEST_METRICS_ENABLED=True, METRICS_TOKEN='segredo')
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Mission.objects.create(name='Missão')
+
+    def setUp(self):
+        metrics_registry.clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('mission'))
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serialize', 'total'})
+        self.assertIn('desc="1 queries"', timing['db'])
+
+        snapshot = metrics_registry.snapshot()['MissionView']
+        self.assertEqual((snapshot['requests'], snapshot['queries']), (1, 1))
+
+    def test_metrics_output(self):
+        self.client.get(reverse('mission'))
+        self.client.get(reverse('mission'))
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('api_requests_total{view="MissionView"} 2', body)
+        self.assertIn('api_db_queries_total{view="MissionView"} 2', body)
+        self.assertIn('api_request_duration_seconds_count{view="MissionView"} 2', body)
+        self.assertIn('# TYPE api_ingest_pending gauge', body)
+
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer outro').status_code, 403)
+
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5').status_code, 403)
+
+        with self.settings(REQUEST_METRICS_ENABLED=False):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo').status_code, 404)
+
+class RecordWriteBufferTests(TestCase):
+    def setUp(self):
+        self.written = []
+        patcher = mock.patch('api.ingest.write_records', side_effect=self.write_records)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('api.ingest.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = RecordWriteBuffer()
+        self.addCleanup(self.buffer.flush)
+
+    def write_records(self, rows):
+        rows = list(rows)
+        if any(data.get('bad') for _, data in rows):
+            raise IntegrityError('bad row')
+        self.written.extend(rows)
+
+    def wait_for_flushed(self, count):
+        for _ in range(100):
+            if self.buffer.stats()['flushed'] >= count:
+                return
+            time.sleep(0.02)
+        self.fail(f'Only {self.buffer.stats()["flushed"]} of {count} records flushed')
+
+    def test_flushes_when_full(self):
+        with self.settings(RECORD_WRITE_BUFFER={'enabled': True, 'max_records': 5, 'max_delay_ms': 60000}):
+            for i in range(5):
+                self.buffer.add(1, {'seq': i})
+            self.wait_for_flushed(5)
+        self.assertEqual(self.written, [(1, {'seq': i}) for i in range(5)])
+        stats = self.buffer.stats()
+        self.assertEqual((stats['enqueued'], stats['flushes'], stats['max_batch'], stats['pending']), (5, 1, 5, 0))
+
+    def test_flushes_after_delay(self):
+        with self.settings(RECORD_WRITE_BUFFER={'enabled': True, 'max_records': 500, 'max_delay_ms': 20}):
+            self.buffer.add(1, {'seq': 1})
+            self.wait_for_flushed(1)
+        self.assertEqual(self.written, [(1, {'seq': 1})])
+        self.assertGreater(self.buffer.stats()['max_delay_seconds'], 0)
+
+    @mock.patch.object(RecordWriteBuffer, '_ensure_thread')
+    def test_backpressure_writes_in_caller(self, _):
+        with self.settings(RECORD_WRITE_BUFFER={'enabled': True, 'max_records': 2, 'max_delay_ms': 60000}):
+            for i in range(19):
+                self.buffer.add(1, {'seq': i})
+            stats = self.buffer.stats()
+            self.assertEqual((stats['pending'], stats['flushed']), (19, 0))
+            self.assertGreaterEqual(stats['oldest_pending_seconds'], 0)
+
+            self.buffer.add(1, {'seq': 19})
+        stats = self.buffer.stats()
+        self.assertEqual((stats['pending'], stats['flushed'], stats['flushes']), (0, 20, 1))
+
+    @mock.patch.object(RecordWriteBuffer, '_ensure_thread')
+    def test_bad_row_does_not_fail_batch(self, _):
+        self.buffer.add(1, {'seq': 1})
+        self.buffer.add(1, {'seq': 2, 'bad': True})
+        self.buffer.add(2, {'seq': 3})
+        with self.assertLogs('api.ingest', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.written, [(1, {'seq': 1}), (2, {'seq': 3})])
+        stats = self.buffer.stats()
+        self.assertEqual((stats['flushed'], stats['failed'], stats['pending']), (2, 1, 0))
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import Counter
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Refills and takes from a bucket in one step on the Redis server, so
+# concurrent requests from several workers cannot both spend the same token.
+# The server clock is used so that workers with skewed clocks agree.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - tonumber(state[2])) * refill_rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {allowed, tostring(tokens)}
+"""
+
+class BucketStore:
+    # Token buckets live in the configured cache so that every worker shares
+    # them; if the cache backend is unreachable we keep limiting with a
+    # per-process dictionary instead of letting every request through.
+    # With Redis each take is a single script call; other backends are
+    # updated under a process lock, which is atomic for the local memory
+    # cache used when REDIS_URL is not set.
+    def __init__(self, cache_alias='default'):
+        self.cache_alias = cache_alias
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        now = time.time()
+        timeout = max(1, int(capacity / refill_rate) + 1)
+        try:
+            cache = caches[self.cache_alias]
+            if isinstance(cache, RedisCache):
+                return self._take_redis(cache, key, capacity, refill_rate, timeout)
+            with self._lock:
+                state = cache.get(key)
+                allowed, state, wait = self._refill_and_take(state, capacity, refill_rate, now)
+                cache.set(key, state, timeout)
+                return allowed, wait
+        except Exception:
+            with self._lock:
+                state = self._local.get(key)
+                allowed, state, wait = self._refill_and_take(state, capacity, refill_rate, now)
+                self._local[key] = state
+                return allowed, wait
+
+    def _take_redis(self, cache, key, capacity, refill_rate, timeout):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        allowed, tokens = client.eval(TAKE_SCRIPT, 1, key, capacity, refill_rate, timeout)
+        if allowed:
+            return True, None
+        return False, (1 - float(tokens)) / refill_rate
+
+    def _refill_and_take(self, state, capacity, refill_rate, now):
+        if state is None:
+            tokens, last = float(capacity), now
+        else:
+            tokens, last = state
+            tokens = min(float(capacity), tokens + max(0.0, now - last) * refill_rate)
+
+        if tokens >= 1:
+            return True, (tokens - 1, now), None
+
+        return False, (tokens, now), (1 - tokens) / refill_rate
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+bucket_store = BucketStore()
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+def record_throttle_event(scope, outcome):
+    with _counters_lock:
+        _counters[(scope, outcome)] += 1
+
+def get_throttle_counters():
+    with _counters_lock:
+        counters = {}
+        for (scope, outcome), value in _counters.items():
+            counters.setdefault(scope, {'allowed': 0, 'throttled': 0})[outcome] = value
+        return counters
+
+class TokenBucketThrottle(BaseThrottle):
+    # Per client IP and per scope token bucket. Rates use the DRF syntax
+    # ('5/minute') from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']: the number
+    # is the bucket size and the bucket refills evenly over the period.
+    scope = None
+    store = bucket_store
+    durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self):
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.wait_time = None
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        capacity = int(num)
+        return capacity, capacity / self.durations[period[0]]
+
+    def get_cache_key(self, request, view):
+        return f'throttle_bucket:{self.scope}:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if not self.rate:
+            return True
+
+        capacity, refill_rate = self.parse_rate(self.rate)
+        allowed, self.wait_time = self.store.take(
+            self.get_cache_key(request, view), capacity, refill_rate
+        )
+        record_throttle_event(self.scope, 'allowed' if allowed else 'throttled')
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+class ContactRateThrottle(TokenBucketThrottle):
+    scope = 'contact'
+
+class PasswordResetRateThrottle(TokenBucketThrottle):
+    scope = 'password_reset'
@@ -0,0 +1,55 @@
+import hashlib
+import math
+from django.core.cache import cache
+from .analysis import simplify_trajectory
+from .archive import mission_channels
+from .records import RecordQueryError
+
+# Tolerances are snapped down to one of these levels (metres) so a finished
+# mission has at most this many cached polylines
+TOLERANCE_LEVELS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+DEFAULT_TOLERANCE = 10
+# Cached polylines are keyed by the mission's version, so a change made in
+# any worker makes every worker miss; the timeout only reclaims old entries
+TRAJECTORY_TTL = 24 * 60 * 60
+
+def parse_tolerance(value):
+    if value in (None, ''):
+        return DEFAULT_TOLERANCE
+    try:
+        tolerance = float(value)
+    except ValueError:
+        tolerance = -1
+    if not math.isfinite(tolerance) or tolerance < 0:
+        raise RecordQueryError(f'Tolerância inválida: {value} (metros, >= 0)')
+    return max(level for level in TOLERANCE_LEVELS if level <= tolerance)
+
+def mission_version(mission):
+    # Closing, reopening and late records all change the end date or the
+    # record count kept in the summary
+    summary = mission.summary or {}
+    source = f'{mission.end_date}:{summary.get("record_count")}'
+    return hashlib.sha256(source.encode()).hexdigest()[:12]
+
+def trajectory_key(mission, tolerance):
+    return f'trajectory-{mission.id}-{mission_version(mission)}-{tolerance}'
+
+def compute_trajectory(mission, tolerance):
+    t, columns = mission_channels(mission, {}, ('latitude', 'longitude'))
+    return {
+        'tolerance': tolerance,
+        'point_count': int(len(t)),
+        'points': simplify_trajectory(columns['latitude'], columns['longitude'], tolerance),
+    }
+
+def get_trajectory(mission, tolerance):
+    # Records of a live mission keep changing, only finished ones are cached
+    if not mission.end_date:
+        return compute_trajectory(mission, tolerance)
+
+    key = trajectory_key(mission, tolerance)
+    trajectory = cache.get(key)
+    if trajectory is None:
+        trajectory = compute_trajectory(mission, tolerance)
+        cache.set(key, trajectory, TRAJECTORY_TTL)
+    return trajectory
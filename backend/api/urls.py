@@ -12,6 +12,7 @@ urlpatterns = [
     path('complete-reset-password', CompleteResetPasswordView.as_view(), name='complete_reset_password'),
     
     path('newsarticle', NewsArticleView.as_view(), name='newsarticle'),
+    path('newsarticle/search', SearchNewsArticlesView.as_view(), name='newsarticle_search'),
     path('newsarticle/<int:news_article_id>', GetNewsArticleView.as_view(), name='newsarticle_get'),
     path('newsarticle/create', CreateNewsArticleView.as_view(), name='newsarticle_create'),
     path('newsarticle/update/<int:news_article_id>', UpdateNewsArticleView.as_view(), name='newsarticle_update'),
@@ -28,6 +29,9 @@ urlpatterns = [
     path('mission/<int:mission_id>/update', UpdateMissionView.as_view(), name='mission_update'),
     path('mission/<int:mission_id>/records', MissionRecordsView.as_view(), name='mission_records'),
     path('mission/<int:mission_id>/records/import', ImportMissionRecordsView.as_view(), name='import_mission_records'),
+    path('mission/<int:mission_id>/aggregate', MissionAggregateView.as_view(), name='mission_aggregate'),
+    path('mission/<int:mission_id>/trajectory', MissionTrajectoryView.as_view(), name='mission_trajectory'),
+    path('mission/compare', CompareMissionsView.as_view(), name='mission_compare'),
     
     path('mission/current', GetCurrentMissionView.as_view(), name='current_mission'),
     path('mission/<int:mission_id>/add-record', AddMissionRecordView.as_view(), name='add_mission_record'),
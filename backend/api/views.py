@@ -6,10 +6,28 @@ import dateutil.parser
 from django.shortcuts import render
 from django.contrib.auth.hashers import make_password
 from django.core.mail import EmailMessage
+from django.db import IntegrityError, transaction
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import IsAuthenticated
+from .authentication import TokenAuthentication, create_token, get_token_max_age
+from .throttling import LoginRateThrottle, ContactRateThrottle, PasswordResetRateThrottle
+from .images import ImageQueryError, filter_images
+from .ingest import late_records_written, make_record, record_buffer
+from .registry import mission_registry
+from .records import RecordQueryError, SENSOR_CHANNELS, parse_fields, records_payload
+from .archive import mission_channels, mission_records, missions_channels, restore_mission
+from .search import SearchQueryError, parse_page, search_articles
+from .snapshots import snapshot_response
+from .telemetry import TelemetryError, normalize_record, normalize_records
+from .pipeline import close_out_mission, reopen_mission
+from .trajectory import get_trajectory, parse_tolerance
+from .export import export_response
+from .analysis import (
+    ALIGNMENTS, aggregate_buckets, compare_missions, parse_aggregates, parse_duration,
+)
 from .models import *
 from .serializers import *
 
@@ -34,6 +52,8 @@ def verify_recaptcha(recaptcha_token):
     return True
 
 class LoginView(APIView):
+    throttle_classes = [LoginRateThrottle]
+
     def post(self, request, format=None):
         recaptcha_token = request.data['recaptcha_token']
         
@@ -66,6 +86,8 @@ class LoginView(APIView):
                         'success': True,
                         'message': 'Login efetuado com sucesso!',
                         'user': serializer.data,
+                        'token': create_token(user),
+                        'expires_in': get_token_max_age(),
                     },
                     status=status.HTTP_200_OK,
                 )
@@ -126,6 +148,8 @@ class GetUserView(APIView):
             )
 
 class PasswordResetView(APIView):
+    throttle_classes = [PasswordResetRateThrottle]
+
     def post(self, request, format=None):
         recaptcha_token = request.data.get('recaptcha_token', '')
         
@@ -259,6 +283,8 @@ class VerifyResetTokenView(APIView):
             )
 
 class CompleteResetPasswordView(APIView):
+    throttle_classes = [PasswordResetRateThrottle]
+
     def post(self, request, format=None):
         recaptcha_token = request.data.get('recaptcha_token', '')
         
@@ -332,8 +358,8 @@ class CompleteResetPasswordView(APIView):
 class NewsArticleView(APIView):
     def get(self, request, format=None):
         try:
-            news_articles = NewsArticle.objects.all().order_by('-published_date')
-            serializer = NewsArticleSerializer(news_articles, many=True)
+            news_articles = NewsArticle.Summaries().order_by('-published_date')
+            serializer = NewsArticleSummarySerializer(news_articles, many=True)
             return Response(
                 {
                     'success': True,
@@ -350,11 +376,44 @@ class NewsArticleView(APIView):
                 },
                 status=status.HTTP_200_OK,
             )
-    
+
+class SearchNewsArticlesView(APIView):
+    def get(self, request, format=None):
+        try:
+            page, page_size = parse_page(request.query_params)
+            matches, total = search_articles(request.query_params.get('q', ''), page, page_size)
+
+            articles = NewsArticle.Summaries().in_bulk([id for id, _ in matches])
+            results = []
+            for id, snippet in matches:
+                result = NewsArticleSummarySerializer(articles[id]).data
+                result['snippet'] = snippet
+                results.append(result)
+
+            return Response(
+                {
+                    'success': True,
+                    'message': 'Pesquisa concluída com sucesso!',
+                    'news_articles': results,
+                    'count': total,
+                    'page': page,
+                    'page_size': page_size,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except SearchQueryError as e:
+            return Response(
+                {
+                    'success': False,
+                    'message': str(e),
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
 class GetNewsArticleView(APIView):
     def get(self, request, news_article_id, format=None):
         try:
-            news_article = NewsArticle.objects.get(id=news_article_id)
+            news_article = NewsArticle.WithImages().get(id=news_article_id)
             serializer = NewsArticleSerializer(news_article)
             return Response(
                 {
@@ -376,8 +435,10 @@ class GetNewsArticleView(APIView):
 class GetNewsArticleImagesView(APIView):
     def get(self, request, news_article_id, format=None):
         try:
-            news_article = NewsArticle.objects.get(id=news_article_id)
-            images = Image.objects.filter(news_article=news_article)
+            # Active images only unless ?active= says otherwise; an unknown
+            # article simply has none
+            params = {'active': 'true', **request.query_params.dict()}
+            images = filter_images(params, news_article_id=news_article_id)
             serializer = ImageSerializer(images, many=True)
             
             return Response(
@@ -388,23 +449,26 @@ class GetNewsArticleImagesView(APIView):
                 },
                 status=status.HTTP_200_OK,
             )
-        except NewsArticle.DoesNotExist:
+        except ImageQueryError as e:
             return Response(
                 {
                     'success': False,
-                    'message': 'Notícia não encontrada!',
+                    'message': str(e),
                 },
-                status=status.HTTP_404_NOT_FOUND,
+                status=status.HTTP_400_BAD_REQUEST,
             )
             
 class CreateNewsArticleView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
     def post(self, request, format=None):
         serializer = NewsArticleSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             
-            news_articles = NewsArticle.objects.all()
-            serializer = NewsArticleSerializer(news_articles, many=True)
+            news_articles = NewsArticle.Summaries()
+            serializer = NewsArticleSummarySerializer(news_articles, many=True)
             return Response(
                 {
                     'success': True,
@@ -426,6 +490,9 @@ class CreateNewsArticleView(APIView):
             )
             
 class UpdateNewsArticleView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
     def post(self, request, news_article_id, format=None):
         try:
             news_article = NewsArticle.objects.get(id=news_article_id)
@@ -433,8 +500,8 @@ class UpdateNewsArticleView(APIView):
             if serializer.is_valid():
                 serializer.save()
                 
-                news_articles = NewsArticle.objects.all()
-                serializer = NewsArticleSerializer(news_articles, many=True)
+                news_articles = NewsArticle.Summaries()
+                serializer = NewsArticleSummarySerializer(news_articles, many=True)
                 return Response(
                     {
                         'success': True,
@@ -522,7 +589,7 @@ class ImageDuplicationHandlerMixin:
 class ImageView(APIView):
     def get(self, request, format=None):
         try:
-            images = Image.objects.all()
+            images = filter_images(request.query_params)
             serializer = ImageSerializer(images, many=True)
             return Response(
                 {
@@ -532,6 +599,14 @@ class ImageView(APIView):
                 },
                 status=status.HTTP_200_OK,
             )
+        except ImageQueryError as e:
+            return Response(
+                {
+                    'success': False,
+                    'message': str(e),
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Image.DoesNotExist:
             return Response(
                 {
@@ -542,6 +617,8 @@ class ImageView(APIView):
             )
             
 class CreateImageView(APIView, ImageDuplicationHandlerMixin):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
     
     def post(self, request, format=None):
@@ -554,7 +631,7 @@ class CreateImageView(APIView, ImageDuplicationHandlerMixin):
             if has_image and file_hash and not existing_image:
                 self.store_image_hash(image, file_hash)
             
-            images = Image.objects.all()
+            images = filter_images({})
             imagesSerializer = ImageSerializer(images, many=True)
             return Response(
                 {
@@ -577,6 +654,8 @@ class CreateImageView(APIView, ImageDuplicationHandlerMixin):
             )
             
 class UpdateImageView(APIView, ImageDuplicationHandlerMixin):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
     
     def post(self, request, image_id, format=None):
@@ -599,7 +678,7 @@ class UpdateImageView(APIView, ImageDuplicationHandlerMixin):
                 if has_image and file_hash and not existing_image:
                     self.store_image_hash(updated_image, file_hash)
                 
-                images = Image.objects.all()
+                images = filter_images({})
                 imagesSerializer = ImageSerializer(images, many=True)
                 return Response(
                     {
@@ -655,7 +734,7 @@ class GetMissionView(APIView):
     def get(self, request, mission_id, format=None):
         try:
             mission = Mission.objects.get(id=mission_id)
-            serializer = MissionSerializer(mission)
+            serializer = MissionDetailSerializer(mission)
             return Response(
                 {
                     'success': True,
@@ -674,6 +753,8 @@ class GetMissionView(APIView):
             )
 
 class CreateMissionView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
     def post(self, request, format=None):
         serializer = MissionSerializer(data=request.data)
         if serializer.is_valid():
@@ -701,6 +782,8 @@ class CreateMissionView(APIView):
             )
 
 class UpdateMissionView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
     def post(self, request, mission_id, format=None):
         try:
             mission = Mission.objects.get(id=mission_id)
@@ -723,6 +806,12 @@ class UpdateMissionView(APIView):
             
             mission.save()
             
+            # Closing a mission computes its summary and freezes its records
+            if mission.end_date:
+                close_out_mission(mission)
+            else:
+                reopen_mission(mission)
+            
             return Response(
                 {
                     'success': True,
@@ -752,46 +841,158 @@ class MissionRecordsView(APIView):
     def get(self, request, mission_id, format=None):
         try:
             mission = Mission.objects.get(id=mission_id)
-            records = Record.objects.filter(mission=mission)
             
-            if not records:
+            # Unfiltered reads of finished missions are served from snapshots
+            is_snapshot = mission.end_date is not None and set(request.query_params) <= {'export'}
+            
+            if 'export' in request.query_params:
+                if is_snapshot and request.query_params['export'] == 'binary':
+                    return snapshot_response(request, mission, 'binary')
+                return export_response(mission, request.query_params['export'], request.query_params)
+            
+            if is_snapshot:
+                return snapshot_response(request, mission, 'json')
+            
+            records_data = mission_records(mission, request.query_params)
+            return Response(records_payload(records_data), status=status.HTTP_200_OK)
+            
+        except RecordQueryError as e:
+            return Response(
+                {
+                    'success': False,
+                    'message': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Mission.DoesNotExist:
+            return Response(
+                {
+                    'success': False,
+                    'message': 'Missão não encontrada'
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+class MissionAggregateView(APIView):
+    def get(self, request, mission_id, format=None):
+        try:
+            mission = Mission.objects.get(id=mission_id)
+            bucket_seconds = parse_duration(request.query_params.get('bucket', '10s'), 'bucket')
+            aggregates = parse_aggregates(request.query_params.get('agg'))
+            t, columns = mission_channels(mission, request.query_params)
+            
+            return Response(
+                {
+                    'success': True,
+                    'message': 'Agregação obtida com sucesso',
+                    'aggregate': aggregate_buckets(t, columns, bucket_seconds, aggregates),
+                },
+                status=status.HTTP_200_OK,
+            )
+            
+        except RecordQueryError as e:
+            return Response(
+                {
+                    'success': False,
+                    'message': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Mission.DoesNotExist:
+            return Response(
+                {
+                    'success': False,
+                    'message': 'Missão não encontrada'
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+class MissionTrajectoryView(APIView):
+    def get(self, request, mission_id, format=None):
+        try:
+            mission = Mission.objects.get(id=mission_id)
+            tolerance = parse_tolerance(request.query_params.get('tolerance'))
+            
+            return Response(
+                {
+                    'success': True,
+                    'message': 'Trajetória obtida com sucesso',
+                    'trajectory': get_trajectory(mission, tolerance),
+                },
+                status=status.HTTP_200_OK,
+            )
+            
+        except RecordQueryError as e:
+            return Response(
+                {
+                    'success': False,
+                    'message': str(e)
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Mission.DoesNotExist:
+            return Response(
+                {
+                    'success': False,
+                    'message': 'Missão não encontrada'
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+class CompareMissionsView(APIView):
+    def get(self, request, format=None):
+        try:
+            try:
+                mission_ids = [int(id) for id in request.query_params.get('missions', '').split(',') if id]
+                points = int(request.query_params.get('points', 500))
+            except ValueError:
+                raise RecordQueryError('missions e points devem ser números inteiros')
+            
+            align = request.query_params.get('align', 'time')
+            fields = parse_fields(request.query_params.get('fields')) or list(SENSOR_CHANNELS)
+            
+            if len(mission_ids) < 2:
+                raise RecordQueryError('Indique pelo menos duas missões')
+            if align not in ALIGNMENTS:
+                raise RecordQueryError(f'align deve ser um de: {", ".join(ALIGNMENTS)}')
+            if not 2 <= points <= 5000:
+                raise RecordQueryError('points deve estar entre 2 e 5000')
+            
+            found = {mission.id: mission for mission in Mission.objects.filter(id__in=mission_ids).only('id', 'archived_at')}
+            missing = [id for id in mission_ids if id not in found]
+            if missing:
                 return Response(
                     {
-                        'success': True,
-                        'message': 'Nenhum registo encontrado para esta missão',
-                        'records': []
+                        'success': False,
+                        'message': f'Missões não encontradas: {", ".join(map(str, missing))}'
                     },
-                    status=status.HTTP_200_OK,
+                    status=status.HTTP_404_NOT_FOUND,
                 )
-                
-            records_data = []
-            for record in records:
-                record_info = {
-                    'id': record.id,
-                    'data': record.data,
-                    'created_at': record.created_at
-                }
-                records_data.append(record_info)
-                
+            
+            load_fields = fields if align != 'altitude' or 'altitude_m' in fields else fields + ['altitude_m']
+            channels = missions_channels([found[id] for id in mission_ids], load_fields)
+            
             return Response(
                 {
                     'success': True,
-                    'message': 'registos obtidos com sucesso',
-                    'records': records_data
+                    'message': 'Comparação obtida com sucesso',
+                    'comparison': compare_missions(channels, fields, align, points),
                 },
                 status=status.HTTP_200_OK,
             )
             
-        except Mission.DoesNotExist:
+        except RecordQueryError as e:
             return Response(
                 {
                     'success': False,
-                    'message': 'Missão não encontrada'
+                    'message': str(e)
                 },
-                status=status.HTTP_404_NOT_FOUND,
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
 class ImportMissionRecordsView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
     def post(self, request, mission_id, format=None):
         try:
             mission = Mission.objects.get(id=mission_id)
@@ -806,67 +1007,62 @@ class ImportMissionRecordsView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
                             
-            # Sort records by timestamp if available
-            if 'data' in records_data[0] and 'timestamp' in records_data[0]['data']:
-                sorted_records = sorted(
-                    records_data, 
-                    key=lambda x: x['data'].get('timestamp', 0)
+            # Validate and clean every record before anything is written
+            records, errors = normalize_records(
+                record_item.get('data') if isinstance(record_item, dict) else None
+                for record_item in records_data
+            )
+            if errors:
+                return Response(
+                    {
+                        'success': False,
+                        'message': 'Registos inválidos: ' + '; '.join(
+                            f'#{index + 1}: {message}' for index, message in errors[:10]
+                        ),
+                        'invalid_count': len(errors),
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                
-                # Get first and last timestamp for start and end dates
-                first_timestamp = None
-                last_timestamp = None
-                
-                for record in sorted_records:
-                    if 'timestamp' in record['data']:
-                        timestamp_str = record['data']['timestamp']
-                        try:
-                            # Parse timestamp and explicitly preserve its timezone (or assume local timezone)
-                            timestamp = dateutil.parser.parse(timestamp_str)
-                            
-                            # Make timestamp timezone-aware with the correct timezone
-                            # Django uses UTC internally, so convert to the same timezone as Django's settings
-                            if timestamp.tzinfo is None:
-                                # Attach Portugal timezone (Europe/Lisbon) to the naive timestamp
-                                from django.utils import timezone
-                                timestamp = timezone.make_aware(timestamp)
-                                
-                            # Now Django won't adjust the time when storing/retrieving
-                            if first_timestamp is None or timestamp < first_timestamp:
-                                first_timestamp = timestamp
-                            if last_timestamp is None or timestamp > last_timestamp:
-                                last_timestamp = timestamp
-                        except:
-                            pass
+            
+            # Normalized timestamps sort chronologically as text
+            timestamps = [record['timestamp'] for record in records if 'timestamp' in record]
+            if timestamps:
+                first_timestamp = dateutil.parser.isoparse(min(timestamps))
+                last_timestamp = dateutil.parser.isoparse(max(timestamps))
                 
                 # For import missions, set the start_date if it's NULL
-                if mission.start_date is None and first_timestamp:
+                if mission.start_date is None:
                     mission.start_date = first_timestamp
                     
                 # Set end_date and calculate duration
-                if last_timestamp:
-                    mission.end_date = last_timestamp
-                    
-                    if mission.start_date:
-                        duration = last_timestamp - mission.start_date
-                        mission.duration = duration
+                mission.end_date = last_timestamp
+                mission.duration = last_timestamp - mission.start_date
                 
                 mission.save()
             
-            # Import records
-            imported_count = 0
-            for record_item in records_data:
-                Record.objects.create(
-                    mission=mission,
-                    data=record_item['data']
+            # Import records in bulk instead of one INSERT per record; records
+            # already stored (a re-imported log) are skipped by the unique index
+            if mission.archived_at:
+                restore_mission(mission)
+            with transaction.atomic():
+                existing_count = Record.objects.filter(mission=mission).count()
+                Record.objects.bulk_create(
+                    (make_record(mission.id, record) for record in records),
+                    ignore_conflicts=True,
                 )
-                imported_count += 1
+                imported_count = Record.objects.filter(mission=mission).count() - existing_count
+            
+            if mission.end_date:
+                close_out_mission(mission)
+            else:
+                reopen_mission(mission)
                 
             return Response(
                 {
                     'success': True,
                     'message': f'{imported_count} registos importados com sucesso',
                     'count': imported_count,
+                    'duplicates': len(records) - imported_count,
                     'mission_id': mission.id
                 },
                 status=status.HTTP_200_OK,
@@ -890,13 +1086,16 @@ class ImportMissionRecordsView(APIView):
             )
 
 class AddMissionRecordView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
     def post(self, request, mission_id, format=None):
         try:
-            # Find the mission by ID
-            mission = Mission.objects.get(id=mission_id)
+            # Mission state comes from the registry, not the database
+            mission = mission_registry.get(mission_id)
             
             # Check if mission is already completed
-            if mission.end_date:
+            if mission['end_date']:
                 return Response(
                     {
                         'success': False,
@@ -917,16 +1116,61 @@ class AddMissionRecordView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             
-            # Create a new record
-            record = Record.objects.create(
-                mission=mission,
-                data=record_data
-            )
+            try:
+                record_data = normalize_record(record_data)
+            except TelemetryError as e:
+                return Response(
+                    {
+                        'success': False,
+                        'message': str(e)
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             
             # If mission is realtime and this is first record, set start_date
-            if mission.is_realtime and mission.start_date is None:
-                mission.start_date = timezone.now()
-                mission.save()
+            if mission['is_realtime'] and mission['start_date'] is None:
+                mission_registry.mark_started(mission_id)
+            
+            # Queue the record to be written with the next batch
+            if record_buffer.enabled:
+                record_buffer.add(mission_id, record_data)
+                return Response(
+                    {
+                        'success': True,
+                        'message': 'Record queued successfully',
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
+            
+            # Create a new record; a retried packet is caught by the unique index
+            record = make_record(mission_id, record_data)
+            try:
+                with transaction.atomic():
+                    record.save()
+            except IntegrityError:
+                # Only a stored packet with the same key makes this a retry;
+                # anything else, such as a mission deleted meanwhile, is an error
+                if record.dedup_key is None or not Record.objects.filter(
+                    mission_id=mission_id, dedup_key=record.dedup_key
+                ).exists():
+                    if not Mission.objects.filter(id=mission_id).exists():
+                        raise Mission.DoesNotExist
+                    raise
+                return Response(
+                    {
+                        'success': True,
+                        'message': 'Record already received',
+                        'duplicate': True
+                    },
+                    status=status.HTTP_200_OK,
+                )
+            
+            # The registry state can be stale or the mission closed meanwhile;
+            # a record that landed in a finished mission refreshes its close-out
+            # like any other late write (see ingest.write_records)
+            finished = list(Mission.objects.filter(id=mission_id, end_date__isnull=False))
+            if finished:
+                late_records_written.send(sender=Record, missions=finished)
             
             return Response(
                 {
@@ -957,22 +1201,18 @@ class AddMissionRecordView(APIView):
 class GetCurrentMissionView(APIView):
     def post(self, request, format=None):
         try:
-            current_mission = Mission.objects.filter(
-                start_date__isnull=True,
-                is_realtime=True
-            ).last()
+            current_mission_id = mission_registry.current()
 
-            if current_mission:
+            if current_mission_id:
                 return Response(
                     {
                         'success': True,
                         'message': 'Current active mission found',
-                        'mission_id': current_mission.id,
+                        'mission_id': current_mission_id,
                         'timestamp': timezone.now()
                     },
                     status=status.HTTP_200_OK,
                 )
-        except Mission.DoesNotExist:
             return Response(
                 {
                     'success': False,
@@ -990,6 +1230,8 @@ class GetCurrentMissionView(APIView):
             )
        
 class ContactView(APIView):
+    throttle_classes = [ContactRateThrottle]
+
     def post(self, request, format=None):
         recaptcha_token = request.data.get('recaptcha_token', '')
         
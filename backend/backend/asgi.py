@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up; telemetry ingest is served on the event
+# loop and every other request goes to Django
+from api.async_ingest import AsyncIngestApplication
+
+application = AsyncIngestApplication(django_application)
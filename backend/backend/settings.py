@@ -17,6 +17,10 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -44,7 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,12 +84,58 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres selects PostgreSQL (configured through the POSTGRES_*
+# variables) so concurrent ingest is not serialized behind SQLite's single
+# writer lock. Connections persist for DB_CONN_MAX_AGE seconds unless
+# DB_POOL=true, which uses psycopg's connection pool instead and needs the
+# psycopg[pool] extra (Django does not allow both at once).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DB_POOL = env_bool('DB_POOL', False)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'glebsat'),
+            'USER': os.environ.get('POSTGRES_USER', 'glebsat'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+                    'timeout': 10,
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    # The database is switched to WAL once by migration 0018_sqlite_wal, which
+    # lets readers proceed while a record is being written. NORMAL synchronous
+    # is durable in WAL mode except on power loss, and the busy timeout makes
+    # concurrent writers wait instead of failing with "database is locked".
+    # IMMEDIATE transactions take the write lock up front so the busy timeout
+    # is honoured.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=5000;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                ),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -127,6 +179,68 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Set REDIS_URL to share the rate limiting buckets between workers.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Write-behind buffering for realtime records (AddMissionRecordView). Records
+# are acknowledged with 202 and written in one transaction every max_records
+# records or max_delay_ms milliseconds; a crash loses at most that window.
+RECORD_WRITE_BUFFER = {
+    'enabled': env_bool('RECORD_WRITE_BUFFER', False),
+    'max_records': int(os.environ.get('RECORD_WRITE_BUFFER_MAX_RECORDS', '500')),
+    'max_delay_ms': int(os.environ.get('RECORD_WRITE_BUFFER_MAX_DELAY_MS', '200')),
+}
+
+# Telemetry posted to /api/mission/<id>/ingest when served over ASGI
+ASYNC_INGEST = {
+    'max_queue': int(os.environ.get('ASYNC_INGEST_MAX_QUEUE', '10000')),
+    'max_records': int(os.environ.get('ASYNC_INGEST_MAX_RECORDS', '500')),
+    'max_delay_ms': int(os.environ.get('ASYNC_INGEST_MAX_DELAY_MS', '200')),
+    'enqueue_timeout_ms': 100,
+    'max_body_bytes': 64 * 1024,
+    'state_ttl_ms': 1000,
+}
+
+# Finished missions are moved to a compressed archive this many days after
+# their end date by the archive_missions command
+RECORD_ARCHIVE_AFTER_DAYS = int(os.environ.get('RECORD_ARCHIVE_AFTER_DAYS', '30'))
+
+# Responses smaller than this (in bytes) are sent uncompressed
+COMPRESSION_MIN_SIZE = 512
+
+# Compressed copies of immutable payloads, such as finished missions' records
+PRECOMPRESSED_CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+
+# Per-view query count and latency reporting (Server-Timing header and /metrics)
+REQUEST_METRICS_ENABLED = env_bool('REQUEST_METRICS_ENABLED', DEBUG)
+# Bearer token the scraper sends to /metrics; when empty only requests from
+# localhost are answered
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+REST_FRAMEWORK = {
+    # Token bucket sizes per client IP, refilled evenly over the period
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '10/minute',
+        'contact': '5/minute',
+        'password_reset': '5/hour',
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
@@ -146,4 +260,7 @@ EMAIL_HOST_USER = 'canpansatpat@gmail.com'
 EMAIL_HOST_PASSWORD = 'njji pkye eyel jols'
 
 TIME_ZONE = 'Europe/Lisbon'
-USE_TZ = True
\ No newline at end of file
+USE_TZ = True
+
+# Validity (in seconds) of the signed tokens issued by LoginView
+AUTH_TOKEN_MAX_AGE = 60 * 60 * 12
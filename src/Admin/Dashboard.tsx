@@ -53,6 +53,7 @@ const Dashboard = (props:any) => {
         localStorage.setItem('email', '');
         localStorage.setItem('userId', '');
         localStorage.setItem('username', '');
+        localStorage.setItem('authToken', '');
         navigate('/admin/login', { replace: true });
         return;
       }
@@ -63,6 +64,7 @@ const Dashboard = (props:any) => {
         localStorage.setItem('email', '');
         localStorage.setItem('userId', '');
         localStorage.setItem('username', '');
+        localStorage.setItem('authToken', '');
         navigate('/admin/login', { replace: true });
         return;
       }
@@ -73,6 +75,7 @@ const Dashboard = (props:any) => {
         localStorage.setItem('email', '');
         localStorage.setItem('userId', '');
         localStorage.setItem('username', '');
+        localStorage.setItem('authToken', '');
         navigate('/admin/login', { replace: true });
         return;
       }
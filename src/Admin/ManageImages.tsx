@@ -162,6 +162,9 @@ const ImagesContent = () => {
 
             const response = await fetch(API_URL + path, {
                 method: 'POST',
+                headers: {
+                    Authorization: `Bearer ${localStorage.getItem('authToken') ?? ''}`,
+                },
                 body: formData,
             });
             const data = await response.json();
@@ -121,6 +121,9 @@ const NewsContent = () => {
 
             const response = await fetch(API_URL + path, {
                 method: 'POST',
+                headers: {
+                    Authorization: `Bearer ${localStorage.getItem('authToken') ?? ''}`,
+                },
                 body: formData,
             });
             const data = await response.json();
@@ -176,10 +179,17 @@ const NewsContent = () => {
         handleDialogClose();
     };
 
+    // The list only has summaries; an update sends the whole article
+    const fetchFullArticle = async (newsArticle: NewsArticle): Promise<NewsArticle> => {
+        const response = await fetch(API_URL + '/newsarticle/' + newsArticle.id);
+        const data = await response.json();
+        return data.success ? { ...newsArticle, ...data.news_article } : newsArticle;
+    };
+
     const handleToggleActive = async () => {
         if (currentMenuIndex === null) return;
         
-        const newsArticle = newsArticles[currentMenuIndex];
+        const newsArticle = await fetchFullArticle(newsArticles[currentMenuIndex]);
         const pinned = !newsArticle.active ? newsArticle.pinned : false;
         const updatedArticle = {
             ...newsArticle,
@@ -201,7 +211,7 @@ const NewsContent = () => {
     const handleTogglePinned = async () => {
         if (currentMenuIndex === null) return;
         
-        const newsArticle = newsArticles[currentMenuIndex];
+        const newsArticle = await fetchFullArticle(newsArticles[currentMenuIndex]);
         const updatedArticle = {...newsArticle, pinned: !newsArticle.pinned};
         
         const success = await saveNewsArticles('/newsarticle/update/' + newsArticle.id, updatedArticle);
@@ -215,11 +225,12 @@ const NewsContent = () => {
         handleMenuClose();
     };
 
-    const handleDialogOpen = (newsArticle: NewsArticle | null = null) => {
+    const handleDialogOpen = async (newsArticle: NewsArticle | null = null) => {
         const userId = localStorage.getItem('userId');
         const authorId = userId && userId !== '' ? parseInt(userId) : 1;
         
         if (newsArticle) {
+            newsArticle = await fetchFullArticle(newsArticle);
             const dateString = newsArticle.published_date || new Date().toISOString().split('T')[0];
             setCurrentNewsArticle({
                 ...newsArticle,
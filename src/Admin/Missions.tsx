@@ -168,7 +168,10 @@ const MissionsContent = () => {
         try {
             const response = await fetch(`${API_URL}/mission/create`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: {
+                    'Content-Type': 'application/json',
+                    Authorization: `Bearer ${localStorage.getItem('authToken') ?? ''}`,
+                },
                 body: JSON.stringify(newMission),
             });
             const data = await response.json();
@@ -358,6 +361,7 @@ const MissionsContent = () => {
                             method: 'POST',
                             headers: {
                                 'Content-Type': 'application/json',
+                                Authorization: `Bearer ${localStorage.getItem('authToken') ?? ''}`,
                             },
                             body: JSON.stringify({ records: payload }),
                         });
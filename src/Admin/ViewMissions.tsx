@@ -26,6 +26,7 @@ import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
 import { demoSensorData, demoTrajectoryData } from './internals/data/sensorData';
 import SensorChart from './components/SensorChart';
+import { fetchChartRecords, fetchTrajectory } from '../services/MissionData';
 
 const API_URL = import.meta.env.VITE_BACKEND_API_URL;
 
@@ -78,19 +79,21 @@ export default function ViewMissions() {
           const isRealtimeMission = missionData.mission.is_realtime;
           setIsLive(isRealtimeMission && !missionData.mission.end_date);
           
-          // Fetch records for the mission
-          const recordsResponse = await fetch(`${API_URL}/mission/${missionId}/records`);
-          const recordsData = await recordsResponse.json();
+          // The chart data and the simplified trajectory are independent
+          const [records, trajectory] = await Promise.all([
+            fetchChartRecords(missionData.mission),
+            fetchTrajectory(missionId),
+          ]);
           
-          if (recordsData.success && recordsData.records.length > 0) {
+          if (records.length > 0) {
             // Process the records into sensor data
-            const processedData = processSensorData(recordsData.records);
+            const processedData = processSensorData(records);
             setSensorData(processedData);
             
-            // Extract trajectory data
-            const trajectory = processedData.trajectoryData;
-            if (trajectory && trajectory.length > 0) {
-              setTrajectoryData(trajectory);
+            // The map uses the simplified trajectory from the server
+            const points = trajectory.length > 0 ? trajectory : processedData.trajectoryData;
+            if (points && points.length > 0) {
+              setTrajectoryData(points);
             } else {
               // Fallback to demo data
               setTrajectoryData(demoTrajectoryData);
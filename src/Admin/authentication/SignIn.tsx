@@ -131,12 +131,14 @@ const SignInContent = (props: any) => {
         localStorage.setItem('email', email);
         localStorage.setItem('userId', response.data.user.id);
         localStorage.setItem('username', response.data.user.name);
+        localStorage.setItem('authToken', response.data.token);
         navigate('/admin', { replace: true });
       } else {
         localStorage.setItem('isLoggedIn', 'false');
         localStorage.setItem('email', '');
         localStorage.setItem('userId', '');
         localStorage.setItem('username', '');
+        localStorage.setItem('authToken', '');
         enqueueSnackbar('Erro ao iniciar sessão.', { variant: 'error' });
       }
     } catch (err) {
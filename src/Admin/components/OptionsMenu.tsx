@@ -24,6 +24,7 @@ export default function OptionsMenu() {
     localStorage.setItem('email', '');
     localStorage.setItem('userId', '');
     localStorage.setItem('username', '');
+    localStorage.setItem('authToken', '');
     navigate('/admin/login');
   };
 
@@ -24,6 +24,7 @@ export default function SideMenuMobile({ open, toggleDrawer }: SideMenuMobilePro
     localStorage.setItem('email', '');
     localStorage.setItem('userId', '');
     localStorage.setItem('username', '');
+    localStorage.setItem('authToken', '');
     navigate('/admin/login');
   };
   
@@ -31,6 +31,7 @@ function App() {
 		localStorage.setItem('email', '');
 		localStorage.setItem('userId', '');
 		localStorage.setItem('username', '');
+		localStorage.setItem('authToken', '');
 	}
 
 	useEffect(() => {
@@ -47,13 +47,12 @@ const GalleryPage = () => {
 
     const fetchImages = async () => {
       try {
-        const response = await fetch(`${API_URL}/image`);
+        const response = await fetch(`${API_URL}/image?active=true`);
         const data = await response.json();
         
         if (data.success) {
           // Format image URLs properly
           const activeImages = data.images
-            .filter((img: GalleryImage) => img.active)
             .map((img: GalleryImage) => ({
               ...img,
               image: img.image.startsWith('../backend') ? img.image : '../backend' + img.image,
@@ -17,6 +17,7 @@ import { ArrowForward, VideoCall, AccessTime,
 import { motion } from 'framer-motion';
 import { Link } from 'react-router-dom';
 import FrontSensorChart from './components/FrontSensorChart';
+import { fetchChartRecords, fetchTrajectory } from './services/MissionData';
 
 const API_URL = import.meta.env.VITE_BACKEND_API_URL;
 
@@ -69,20 +70,24 @@ const HomePage = () => {
             const latestMission = completedMissions[0];
             setMission(latestMission);
             
-            // 3. Fetch records for the mission
-            const recordsResponse = await fetch(`${API_URL}/mission/${latestMission.id}/records`);
-            const recordsData = await recordsResponse.json();
+            // 3. Fetch the chart data and the simplified trajectory together;
+            // the mission list leaves out the overview, the detail view has it
+            const missionResponse = await fetch(`${API_URL}/mission/${latestMission.id}`);
+            const missionData = await missionResponse.json();
+            const [records, trajectory] = await Promise.all([
+              fetchChartRecords(missionData.success ? missionData.mission : latestMission),
+              fetchTrajectory(latestMission.id),
+            ]);
             
-            if (recordsData.success && recordsData.records.length > 0) {
+            if (records.length > 0) {
               // Process the records into sensor data
-              const processedData = processSensorData(recordsData.records);
+              const processedData = processSensorData(records);
               setSensorData(processedData);
-              
-              // Extract trajectory data
-              const trajectory = processedData.trajectoryData;
-              if (trajectory && trajectory.length > 0) {
-                setTrajectoryData(trajectory);
-              }
+            }
+            
+            // The map uses the simplified trajectory from the server
+            if (trajectory.length > 0) {
+              setTrajectoryData(trajectory);
             }
           }
         }
@@ -1,10 +1,11 @@
 import { useState, useEffect } from 'react';
 import { 
   Box, Container, Typography, Grid2 as Grid, Card, CardContent, 
-  CardMedia, CardActions, Paper, Button, useTheme, Chip, CircularProgress
+  CardMedia, CardActions, Paper, Button, useTheme, Chip, CircularProgress,
+  TextField, InputAdornment
 } from '@mui/material';
 import { motion } from 'framer-motion';
-import { CalendarMonthRounded, ArrowForward } from '@mui/icons-material';
+import { CalendarMonthRounded, ArrowForward, SearchRounded } from '@mui/icons-material';
 import { Link } from 'react-router-dom';
 
 const API_URL = import.meta.env.VITE_BACKEND_API_URL || '';
@@ -19,13 +20,54 @@ interface NewsArticle {
   active: boolean;
   pinned: boolean;
   main_image?: string | null;
+  snippet?: string;
 }
 
+const SEARCH_PAGE_SIZE = 12;
+
 const NewsPage = () => {
   const theme = useTheme();
   const [loading, setLoading] = useState(true);
   const [featuredNews, setFeaturedNews] = useState<NewsArticle[]>([]);
   const [newsArticles, setNewsArticles] = useState<NewsArticle[]>([]);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState<NewsArticle[] | null>(null);
+  const [searchCount, setSearchCount] = useState(0);
+  const [searchPage, setSearchPage] = useState(1);
+  const [searching, setSearching] = useState(false);
+  
+  // Searches run on the server, one page at a time
+  const fetchSearchPage = async (query: string, page: number) => {
+    try {
+      setSearching(true);
+      const params = new URLSearchParams({ q: query, page: String(page), page_size: String(SEARCH_PAGE_SIZE) });
+      const response = await fetch(`${API_URL}/newsarticle/search?${params}`);
+      const data = await response.json();
+      
+      if (data.success) {
+        setSearchResults(previous => page === 1 || !previous ? data.news_articles : [...previous, ...data.news_articles]);
+        setSearchCount(data.count);
+        setSearchPage(page);
+      } else {
+        setSearchResults([]);
+        setSearchCount(0);
+      }
+    } catch (error) {
+      console.error('Error searching news articles:', error);
+    } finally {
+      setSearching(false);
+    }
+  };
+  
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    const timeout = setTimeout(() => fetchSearchPage(query, 1), 300);
+    return () => clearTimeout(timeout);
+  }, [searchQuery]);
   
   useEffect(() => {
     const fetchNewsArticles = async () => {
@@ -63,6 +105,104 @@ const NewsPage = () => {
     fetchNewsArticles();
   }, []);
 
+  const renderArticleGrid = (articles: NewsArticle[]) => (
+    <Box sx={{ mb: 6 }}>
+      <Grid container spacing={3}>
+        {articles.map((newsArticle, index) => (
+          <Grid size={{ xs: 12, sm: 6, md: 4 }} key={index}>
+            <Card 
+              component={motion.div}
+              whileHover={{ y: -10, boxShadow: '0 10px 20px rgba(0,0,0,0.2)' }}
+              initial={{ opacity: 0, y: 50 }}
+              whileInView={{ opacity: 1, y: 0 }}
+              viewport={{ once: false }}
+              transition={{ duration: 0.5, delay: 0.1 * index }}
+              elevation={3}
+              className="bg-secondary"
+              sx={{ 
+                height: '100%',
+                display: 'flex',
+                flexDirection: 'column',
+                borderRadius: 3,
+                overflow: 'hidden'
+              }}
+            >
+              <CardMedia
+                component="img"
+                height="200"
+                image={newsArticle.main_image 
+                  ? `../backend${newsArticle.main_image}` 
+                  : "/images/placeholder.jpg"}
+                alt={newsArticle.title}
+                className="image-overlay"
+                sx={{ objectFit: 'cover' }}
+              />
+              
+              <CardContent sx={{ flexGrow: 1, p: 3 }}>
+                <Typography 
+                  variant="h6" 
+                  component="h3" 
+                  gutterBottom 
+                  className="color-primary"
+                  fontWeight="bold"
+                  sx={{ mb: 2 }}
+                >
+                  {newsArticle.title}
+                </Typography>
+                
+                <Typography 
+                  variant="body2" 
+                  sx={{ mb: 3 }} 
+                  className="color-secondary"
+                >
+                  {newsArticle.snippet || newsArticle.summary}
+                </Typography>
+                
+                <Box 
+                  sx={{ 
+                    display: 'flex', 
+                    alignItems: 'center', 
+                    mb: 1
+                  }}
+                  className="color-secondary"
+                >
+                  <CalendarMonthRounded sx={{ mr: 1, fontSize: 16 }} />
+                  <Typography variant="body2">
+                    {new Date(newsArticle.published_date).toLocaleDateString('pt-PT', {
+                      year: 'numeric',
+                      month: 'long',
+                      day: 'numeric'
+                    })}
+                  </Typography>
+                </Box>
+              </CardContent>
+              
+              <CardActions sx={{ p: 3, pt: 0 }}>
+                <Button
+                  component={Link}
+                  to={`/news/article/${newsArticle.id}`}
+                  whileHover={{ scale: 1.05 }}
+                  whileTap={{ scale: 0.95 }}
+                  variant="contained"
+                  color="primary"
+                  endIcon={<ArrowForward />}
+                  sx={{ 
+                    mt: 2,
+                    textTransform: 'none',
+                    borderRadius: 2,
+                    px: 3
+                  }}
+                >
+                  Ler Mais
+                </Button>
+              </CardActions>
+            </Card>
+          </Grid>
+        ))}
+      </Grid>
+    </Box>
+  );
+
   if (loading) {
     return (
       <Box 
@@ -130,6 +270,57 @@ const NewsPage = () => {
       </Box>
       
       <Container maxWidth="xl">
+        <Box sx={{ maxWidth: '600px', mx: 'auto', mb: 6 }}>
+          <TextField
+            fullWidth
+            variant="outlined"
+            placeholder="Pesquisar notícias"
+            value={searchQuery}
+            onChange={(event) => setSearchQuery(event.target.value)}
+            slotProps={{
+              input: {
+                startAdornment: (
+                  <InputAdornment position="start">
+                    <SearchRounded />
+                  </InputAdornment>
+                ),
+              },
+            }}
+            sx={{ 
+              '& .MuiOutlinedInput-root': { 
+                borderRadius: 2,
+                '& fieldset': {
+                  borderColor: 'var(--border-main)',
+                },
+              },
+              '& .MuiOutlinedInput-input': {
+                color: 'var(--text-secondary)',
+              },
+            }}
+          />
+        </Box>
+        
+        {searchResults !== null ? (
+          <>
+            <Typography variant="body1" className="color-secondary" sx={{ mb: 3 }}>
+              {searchCount} {searchCount === 1 ? 'resultado' : 'resultados'} para "{searchQuery.trim()}"
+            </Typography>
+            {renderArticleGrid(searchResults)}
+            {searchResults.length < searchCount && (
+              <Box sx={{ textAlign: 'center', mb: 6 }}>
+                <Button
+                  variant="outlined"
+                  disabled={searching}
+                  onClick={() => fetchSearchPage(searchQuery.trim(), searchPage + 1)}
+                  sx={{ textTransform: 'none', borderRadius: 2, px: 3 }}
+                >
+                  Carregar mais
+                </Button>
+              </Box>
+            )}
+          </>
+        ) : (
+        <>
         {featuredNews.length !== 0 && (
           <Box 
             component={motion.div}
@@ -243,102 +434,8 @@ const NewsPage = () => {
           </Box>
         )}
         
-        {newsArticles.length > 0 && (
-          <Box sx={{ mb: 6 }}>
-            <Grid container spacing={3}>
-              {newsArticles.map((newsArticle, index) => (
-                <Grid size={{ xs: 12, sm: 6, md: 4 }} key={index}>
-                  <Card 
-                    component={motion.div}
-                    whileHover={{ y: -10, boxShadow: '0 10px 20px rgba(0,0,0,0.2)' }}
-                    initial={{ opacity: 0, y: 50 }}
-                    whileInView={{ opacity: 1, y: 0 }}
-                    viewport={{ once: false }}
-                    transition={{ duration: 0.5, delay: 0.1 * index }}
-                    elevation={3}
-                    className="bg-secondary"
-                    sx={{ 
-                      height: '100%',
-                      display: 'flex',
-                      flexDirection: 'column',
-                      borderRadius: 3,
-                      overflow: 'hidden'
-                    }}
-                  >
-                    <CardMedia
-                      component="img"
-                      height="200"
-                      image={newsArticle.main_image 
-                        ? `../backend${newsArticle.main_image}` 
-                        : "/images/placeholder.jpg"}
-                      alt={newsArticle.title}
-                      className="image-overlay"
-                      sx={{ objectFit: 'cover' }}
-                    />
-                    
-                    <CardContent sx={{ flexGrow: 1, p: 3 }}>
-                      <Typography 
-                        variant="h6" 
-                        component="h3" 
-                        gutterBottom 
-                        className="color-primary"
-                        fontWeight="bold"
-                        sx={{ mb: 2 }}
-                      >
-                        {newsArticle.title}
-                      </Typography>
-                      
-                      <Typography 
-                        variant="body2" 
-                        sx={{ mb: 3 }} 
-                        className="color-secondary"
-                      >
-                        {newsArticle.summary}
-                      </Typography>
-                      
-                      <Box 
-                        sx={{ 
-                          display: 'flex', 
-                          alignItems: 'center', 
-                          mb: 1
-                        }}
-                        className="color-secondary"
-                      >
-                        <CalendarMonthRounded sx={{ mr: 1, fontSize: 16 }} />
-                        <Typography variant="body2">
-                          {new Date(newsArticle.published_date).toLocaleDateString('pt-PT', {
-                            year: 'numeric',
-                            month: 'long',
-                            day: 'numeric'
-                          })}
-                        </Typography>
-                      </Box>
-                    </CardContent>
-                    
-                    <CardActions sx={{ p: 3, pt: 0 }}>
-                      <Button
-                        component={Link}
-                        to={`/news/article/${newsArticle.id}`}
-                        whileHover={{ scale: 1.05 }}
-                        whileTap={{ scale: 0.95 }}
-                        variant="contained"
-                        color="primary"
-                        endIcon={<ArrowForward />}
-                        sx={{ 
-                          mt: 2,
-                          textTransform: 'none',
-                          borderRadius: 2,
-                          px: 3
-                        }}
-                      >
-                        Ler Mais
-                      </Button>
-                    </CardActions>
-                  </Card>
-                </Grid>
-              ))}
-            </Grid>
-          </Box>
+        {newsArticles.length > 0 && renderArticleGrid(newsArticles)}
+        </>
         )}
       </Container>
     </Box>
@@ -57,12 +57,11 @@ const NewsArticlePage = () => {
           
         setArticle(newsData.news_article);
         
-        const imagesResponse = await fetch(`${API_URL}/image`);
+        const imagesResponse = await fetch(`${API_URL}/image/article/${id}`);
         const imagesData = await imagesResponse.json();
         
         if (imagesData.success && imagesData.images) {
           const articleImages = imagesData.images
-            .filter((img: Image) => img.news_article === parseInt(id as string) && img.active)
             .map((img: Image) => ({
             ...img,
             image: img.image.startsWith('../../backend') ? img.image : '../../backend' + img.image,
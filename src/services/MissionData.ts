@@ -0,0 +1,39 @@
+const API_URL = import.meta.env.VITE_BACKEND_API_URL;
+
+interface MissionOverview {
+  time: number[];
+  series: Record<string, (number | null)[]>;
+}
+
+interface ChartMission {
+  id: number;
+  overview?: MissionOverview | null;
+}
+
+// Finished missions carry a downsampled overview (about 200 points per
+// channel), which is all the charts can show anyway; only live missions and
+// missions not summarized yet need the full record list.
+export const fetchChartRecords = async (mission: ChartMission) => {
+  if (mission.overview) {
+    const { time, series } = mission.overview;
+    return time.map((seconds, i) => {
+      const data: Record<string, string | number> = { timestamp: new Date(seconds * 1000).toISOString() };
+      Object.entries(series).forEach(([field, values]) => {
+        if (values[i] !== null) {
+          data[field] = values[i] as number;
+        }
+      });
+      return { data };
+    });
+  }
+
+  const response = await fetch(`${API_URL}/mission/${mission.id}/records`);
+  const result = await response.json();
+  return result.success ? result.records : [];
+};
+
+export const fetchTrajectory = async (missionId: number | string) => {
+  const response = await fetch(`${API_URL}/mission/${missionId}/trajectory`);
+  const result = await response.json();
+  return result.success ? result.trajectory.points : [];
+};